@@ -4,15 +4,29 @@ Various features for the Roster modules.
 """
 from __future__ import absolute_import
 
+import os
 import re
+import json
+import zlib
+import bisect
 import fnmatch
+import hashlib
+import functools
+import itertools
 import logging
+import threading
+import contextvars
+import collections
 
 import six
 import salt.cache
+import salt.payload
+import salt.syspaths
+import salt.utils.files
 import salt.utils.minions
 
 import salt.utils.dictupdate
+from salt.roster import get_roster_file
 from salt.defaults import DEFAULT_TARGET_DELIM
 
 try:
@@ -20,9 +34,115 @@ try:
 except ImportError:
     from salt.utils import subdict_match
 
+try:
+    from salt.loader.context import NamedLoaderContext
+except ImportError:
+    NamedLoaderContext = None
+
+try:
+    from salt.payload import dumps as payload_dumps
+    from salt.payload import loads as payload_loads
+except ImportError:
+    payload_dumps = salt.payload.Serial("msgpack").dumps
+    payload_loads = salt.payload.Serial("msgpack").loads
+
 log = logging.getLogger(__name__)
 
 
+def file_fingerprint(*paths):
+    """
+    Return a fingerprint of the content of the files provided, to detect
+    whether a Roster source has been changed. Returns ``None`` when none of
+    the files exist.
+    """
+    digest = hashlib.sha1()
+    found = False
+    for path in sorted(set(paths)):
+        if not path or not os.path.isfile(path):
+            continue
+        found = True
+        digest.update(path.encode())
+        with salt.utils.files.fopen(path, "rb") as fp_:
+            for chunk in iter(functools.partial(fp_.read, 65536), b""):
+                digest.update(chunk)
+    return digest.hexdigest() if found else None
+
+
+def loader_value(dunder):
+    """
+    Return the object behind a Salt dunder, e.g., ``__runner__``. On the Salt
+    releases where the dunders are resolved against the loader currently
+    executing, and from a context variable the new threads don't inherit,
+    they can't be passed to other loaders, nor used from other threads.
+    """
+    if NamedLoaderContext is not None and isinstance(dunder, NamedLoaderContext):
+        return dunder.value()
+    return dunder
+
+
+def submit(executor, fun, *args, **kwargs):
+    """
+    Submit ``fun`` to the ``executor``, running under a copy of the context
+    of the calling thread, so the Salt dunders (e.g., ``__opts__``,
+    ``__context__``) are available from the worker threads.
+    """
+    return executor.submit(contextvars.copy_context().run, fun, *args, **kwargs)
+
+
+def roster_files(opts):
+    """
+    Return the list of Roster files for the ``file`` Roster: the Roster file
+    and / or the shards from the Roster directory (i.e., ``roster_file``
+    pointing to a directory, or the ``.d`` directory next to the Roster file).
+    """
+    roster_path = opts.get("roster_file") or os.path.join(
+        opts.get("config_dir", salt.syspaths.CONFIG_DIR), "roster"
+    )
+    files = []
+    if os.path.isdir(roster_path):
+        shards_dir = roster_path
+    else:
+        files.append(get_roster_file(opts))
+        shards_dir = "{}.d".format(files[0])
+    if os.path.isdir(shards_dir):
+        files.extend(
+            os.path.join(shards_dir, shard)
+            for shard in sorted(os.listdir(shards_dir))
+            if not shard.startswith(".")
+            and not shard.endswith("~")
+            and os.path.isfile(os.path.join(shards_dir, shard))
+        )
+    return files
+
+
+def inventory_files(inventory_file):
+    """
+    Return the list of files an Ansible inventory is compiled from: the
+    inventory file itself, as well as the ``group_vars`` and ``host_vars``
+    next to it.
+    """
+    files = [inventory_file]
+    inventory_dir = os.path.dirname(os.path.abspath(inventory_file))
+    for vars_dir in ("group_vars", "host_vars"):
+        for root, _, filenames in os.walk(os.path.join(inventory_dir, vars_dir)):
+            files.extend(os.path.join(root, filename) for filename in filenames)
+    return files
+
+
+def dumps_compact(data):
+    """
+    Serialize and compress the data to be stored into the cache.
+    """
+    return zlib.compress(payload_dumps(data))
+
+
+def loads_compact(blob):
+    """
+    Load the data previously serialized using ``dumps_compact``.
+    """
+    return payload_loads(zlib.decompress(blob))
+
+
 def load_cache(pool, __runner__, opts, tgt, tgt_type=None):
     """
     Load the Pillar and Grain cache, as required, and merge the Roster Grains
@@ -95,12 +215,78 @@ def load_cache(pool, __runner__, opts, tgt, tgt_type=None):
     return pool
 
 
-def glob(pool, tgt, opts=None):
+_GLOB_CHARS = re.compile(r"[*?[]")
+# When the file names are case-insensitive on this platform (i.e., Windows),
+# fnmatch normalises the case, so the prefix lookups can't be used.
+_GLOB_NORMCASE = os.path.normcase("A") != "A"
+
+
+@functools.lru_cache(maxsize=1024)
+def _compile_glob(tgt):
+    """
+    Compile the glob expression, returning a tuple ``(kind, prefix, regex)``,
+    where ``kind`` is one of:
+
+    - ``literal``: there's no wildcard in the expression, so it can be looked
+      up directly.
+    - ``prefix``: the expression is a literal prefix followed by ``*``, e.g.,
+      ``edge*``, so it can be answered by a range lookup over the sorted IDs.
+    - ``regex``: anything else; the IDs starting with the literal prefix (if
+      any) are matched using the compiled regular expression.
+    """
+    wildcard = _GLOB_CHARS.search(tgt)
+    if not wildcard:
+        return "literal", tgt, None
+    prefix = tgt[: wildcard.start()]
+    if not tgt[len(prefix) :].strip("*"):
+        return "prefix", prefix, None
+    return "regex", prefix, re.compile(fnmatch.translate(tgt))
+
+
+class _GlobIndex(object):
+    """
+    The sorted list of device IDs from the pool, used to answer the glob
+    expressions with a literal prefix by a range lookup, instead of matching
+    every single ID. The index is built for one evaluation of a compound
+    expression, and only from the second lookup, as sorting the pool costs
+    more than scanning it once.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.keys = None
+        self.lookups = 0
+
+    def prefixed(self, prefix):
+        if not prefix:
+            return list(self.pool)
+        self.lookups += 1
+        if self.keys is None:
+            if self.lookups < 2:
+                return [minion for minion in self.pool if minion.startswith(prefix)]
+            self.keys = sorted(self.pool)
+        ret = []
+        for minion in itertools.islice(
+            self.keys, bisect.bisect_left(self.keys, prefix), None
+        ):
+            if not minion.startswith(prefix):
+                break
+            ret.append(minion)
+        return ret
+
+
+def glob(pool, tgt, opts=None, index=None):
     """ """
-    log.debug("Glob matching on %s ? %s", pool.items(), tgt)
-    return {
-        minion: pool[minion] for minion in pool.keys() if fnmatch.fnmatch(minion, tgt)
-    }
+    log.debug("Glob matching on %d devices ? %s", len(pool), tgt)
+    if _GLOB_NORMCASE:
+        return {minion: pool[minion] for minion in fnmatch.filter(pool, tgt)}
+    kind, prefix, rgx = _compile_glob(tgt)
+    if kind == "literal":
+        return {tgt: pool[tgt]} if tgt in pool else {}
+    candidates = (index or _GlobIndex(pool)).prefixed(prefix)
+    if kind == "prefix":
+        return {minion: pool[minion] for minion in candidates}
+    return {minion: pool[minion] for minion in candidates if rgx.match(minion)}
 
 
 def grain(pool, tgt, opts=None):
@@ -192,12 +378,8 @@ def pcre(pool, tgt, opts=None):
 
 def nodegroup(pool, tgt, opts=None):
     """ """
-    nodegroups = opts.get("nodegroups", {})
     # tgt is the name of the nodegroup
-    if tgt not in nodegroups:
-        return {}
-    nodegroup_expr = nodegroups[tgt]
-    return compound(pool, nodegroup_expr, opts=opts)
+    return match(pool, tgt, "nodegroup", opts=opts)
 
 
 TGT_FUN = {
@@ -220,124 +402,418 @@ TGT_FUN = {
 }
 
 
-def compound(pool, tgt, opts=None):
+_COMPOUND_OPERS = ("and", "or", "not", "(", ")")
+
+
+class CompoundSyntaxError(ValueError):
     """
-    Execute a compound match on a pool of devices returned by the Roster. The
-    Roster module must collect the entire list of devices managed by this Master
-    / salt-sproxy instance, and this function helps filtering out the Minions
-    that are outside of this target expression.
-    This function returns the list of Minions matched by the target expression,
-    together with their opts (i.e., extra Grains and Pillar).
-    The first argument passed in is ``pool`` which is a dictionary containing
-    the total group of devices that can possibly be managed, and their opts.
+    Raised when a compound target expression cannot be parsed.
+    """
+
+
+class _SetAlgebra(object):
+    """
+    Evaluate the compound expressions using the native Python sets.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def universe(self):
+        return set(self.pool)
+
+    def convert(self, minions):
+        return set(minions)
+
+    def intersection(self, left, right):
+        return left & right
+
+    def union(self, left, right):
+        return left | right
+
+    def difference(self, left, right):
+        return left - right
+
+    def empty(self, value):
+        return not value
+
+    def members(self, value):
+        return value
+
+
+class _BitsetAlgebra(object):
+    """
+    Evaluate the compound expressions using integer bitsets over the device
+    pool: every device is assigned a fixed bit, and the set operations
+    translate into bitwise operations on (arbitrarily large) Python integers,
+    which is significantly cheaper than hashing the device IDs for every term
+    when the pool is very large.
     """
-    minions = {}
-    if not isinstance(tgt, six.string_types) and not isinstance(tgt, (list, tuple)):
-        log.error("Compound target received that is neither string, list nor tuple")
-        return minions
 
-    results = []
-    opers = ["and", "or", "not", "(", ")"]
+    def __init__(self, pool):
+        self.minions = list(pool)
+        self.index = {minion: idx for idx, minion in enumerate(self.minions)}
+        self.size = (len(self.minions) + 7) // 8
+
+    def universe(self):
+        return (1 << len(self.minions)) - 1
+
+    def convert(self, minions):
+        bits = bytearray(self.size)
+        for minion in minions:
+            idx = self.index[minion]
+            bits[idx >> 3] |= 1 << (idx & 7)
+        return int.from_bytes(bytes(bits), "little")
 
+    def intersection(self, left, right):
+        return left & right
+
+    def union(self, left, right):
+        return left | right
+
+    def difference(self, left, right):
+        return left & ~right
+
+    def empty(self, value):
+        return not value
+
+    def members(self, value):
+        ret = set()
+        for byte_idx, byte in enumerate(value.to_bytes(self.size, "little")):
+            if not byte:
+                continue
+            for bit in range(8):
+                if byte & (1 << bit):
+                    ret.add(self.minions[(byte_idx << 3) + bit])
+        return ret
+
+
+def _compound_words(tgt):
+    """
+    Split the compound target into words, inserting the implicit ``and``
+    operator in front of a ``not`` that follows a target term, e.g.,
+    ``G@role:router not edge*`` is equivalent to ``G@role:router and not
+    edge*``.
+    """
     if isinstance(tgt, six.string_types):
         words = tgt.split()
     else:
-        words = tgt[:]
-
-    while words:
-        word = words.pop(0)
-        target_info = salt.utils.minions.parse_target(word)
-
-        if word in opers:
-            if results:
-                if results[-1] == "(" and word in ("and", "or"):
-                    log.error('Invalid beginning operator after "(": %s', word)
-                    return {}
-                if word == "not":
-                    if not results[-1] in ("and", "or", "("):
-                        results.append("and")
-                results.append(word)
-            else:
-                # seq start with binary oper, fail
-                if word not in ["(", "not"]:
-                    log.error("Invalid beginning operator: %s", word)
-                    return {}
-                results.append(word)
-
-        elif target_info and target_info["engine"]:
-            engine = TGT_FUN.get(target_info["engine"])
-            if not engine:
-                # If an unknown engine is called at any time, fail out
-                log.error(
-                    'Unrecognized target engine "%s" for target ' 'expression "%s"',
-                    target_info["engine"],
-                    word,
+        words = list(tgt)
+    ret = []
+    for word in words:
+        if word == "not" and ret and ret[-1] not in ("and", "or", "(", "not"):
+            ret.append("and")
+        ret.append(word)
+    return ret
+
+
+def _compile_term(engine, pattern, nodegroups=None, _stack=()):
+    """
+    Build the AST node for a single target term, compiling the pattern when
+    possible.
+    """
+    if engine not in TGT_FUN:
+        raise CompoundSyntaxError('Unrecognized target engine "{}"'.format(engine))
+    if engine in ("N", "nodegroup") and nodegroups is not None:
+        return _compile_nodegroup(pattern, nodegroups, _stack=_stack)
+    if engine in ("E", "pcre"):
+        try:
+            pattern = re.compile(pattern)
+        except re.error as err:
+            raise CompoundSyntaxError(
+                'Invalid regular expression "{}": {}'.format(pattern, err)
+            )
+    return ("term", engine, pattern)
+
+
+def _compound_term(word, nodegroups=None, _stack=()):
+    """
+    Build the AST node for a single word of a compound target.
+    """
+    target_info = salt.utils.minions.parse_target(word)
+    if target_info and target_info["engine"]:
+        return _compile_term(
+            target_info["engine"],
+            target_info["pattern"],
+            nodegroups=nodegroups,
+            _stack=_stack,
+        )
+    return ("term", "glob", word)
+
+
+def _compile_nodegroup(name, nodegroups, _stack=()):
+    """
+    Expand the nodegroup into a ``("nodegroup", <name>, <node>)`` AST node.
+    The node is ``None`` when the nodegroup is not defined.
+    The nodegroups can reference other nodegroups (using ``N@``), but raises
+    ``CompoundSyntaxError`` when a nodegroup ends up referencing itself.
+    """
+    if name in _stack:
+        raise CompoundSyntaxError(
+            "Circular nodegroup reference: {}".format(" -> ".join(_stack + (name,)))
+        )
+    if name not in nodegroups:
+        log.error('Unknown nodegroup "%s"', name)
+        return ("nodegroup", name, None)
+    return (
+        "nodegroup",
+        name,
+        compile_compound(nodegroups[name], nodegroups, _stack=_stack + (name,)),
+    )
+
+
+def compile_compound(tgt, nodegroups=None, _stack=()):
+    """
+    Parse a compound target expression into an AST made of nested tuples:
+
+    - ``("term", <engine>, <pattern>)``
+    - ``("nodegroup", <name>, <node>)``
+    - ``("not", <node>)``
+    - ``("and", <node>, <node>)``
+    - ``("or", <node>, <node>)``
+
+    The operator precedence is the usual boolean one: ``not`` binds tighter
+    than ``and``, which binds tighter than ``or``.
+    When ``nodegroups`` is provided, the ``N@`` terms are expanded in place,
+    otherwise they are left as regular terms, evaluated on demand.
+    Raises ``CompoundSyntaxError`` when the expression is invalid.
+    """
+    words = _compound_words(tgt)
+    if not words:
+        raise CompoundSyntaxError("Empty compound target expression")
+    pos = [0]
+
+    def _peek():
+        return words[pos[0]] if pos[0] < len(words) else None
+
+    def _next():
+        word = _peek()
+        pos[0] += 1
+        return word
+
+    def _parse_or():
+        node = _parse_and()
+        while _peek() == "or":
+            _next()
+            node = ("or", node, _parse_and())
+        return node
+
+    def _parse_and():
+        node = _parse_not()
+        while _peek() == "and":
+            _next()
+            node = ("and", node, _parse_not())
+        return node
+
+    def _parse_not():
+        if _peek() == "not":
+            _next()
+            return ("not", _parse_not())
+        return _parse_atom()
+
+    def _parse_atom():
+        word = _next()
+        if word is None:
+            raise CompoundSyntaxError("Unexpected end of the target expression")
+        if word == "(":
+            node = _parse_or()
+            if _next() != ")":
+                raise CompoundSyntaxError("Unbalanced parenthesis")
+            return node
+        if word in _COMPOUND_OPERS:
+            raise CompoundSyntaxError("Unexpected operator: {}".format(word))
+        return _compound_term(word, nodegroups=nodegroups, _stack=_stack)
+
+    ast = _parse_or()
+    if pos[0] != len(words):
+        raise CompoundSyntaxError("Unexpected word: {}".format(words[pos[0]]))
+    return ast
+
+
+def _eval_compound(ast, pool, algebra, opts, memo, index):
+    """
+    Recursively evaluate the compound AST against the pool of devices, using
+    the set operations provided by ``algebra``. The devices matched by each
+    nodegroup are memoized into ``memo``, so a nodegroup referenced multiple
+    times is evaluated only once. The glob terms share the ``index`` of the
+    device IDs.
+    """
+    oper = ast[0]
+    if oper == "term":
+        engine = TGT_FUN[ast[1]]
+        if engine is glob:
+            return algebra.convert(glob(pool, ast[2], opts=opts, index=index))
+        return algebra.convert(engine(pool, ast[2], opts=opts))
+    if oper == "nodegroup":
+        if ast[1] not in memo:
+            memo[ast[1]] = (
+                algebra.members(
+                    _eval_compound(ast[2], pool, algebra, opts, memo, index)
                 )
-                return {}
-            res = engine(pool, target_info["pattern"], opts=opts)
-            results.append(str(set(res.keys())))
-
-        else:
-            res = glob(pool, word, opts=opts)
-            results.append(str(set(res.keys())))
-
-    log.debug("Collected individual results")
-    log.debug(results)
-
-    expr_chunks = []
-    parens_count = 0
-    universe = set(pool.keys())
-    # Building the target list, using set theory operations
-    # `X and Y` becomes `X & Y`
-    # `X or Y` becomes `X | Y`
-    # `X and not Y` becomes `X - Y`
-    # `X or not Y` becomes `X | ( U - Y )` where U is the universe, in our case
-    #   being the total group of devices possibly being managed by this
-    #   salt-sproxy instance.
-    #
-    # The following iteration goes through the list of results, and replaces the
-    # CLI operational words, as per logic described above.
-    # TODO: the `and not` operation is fine, but the `or not` might be weak as
-    # it introduces another set of parens which may mess up the expression.
-    # Below, when evaluating the expression, I've added a block to catch the
-    # exception and ask for bug report
-    for index, res in enumerate(results):
-        if res == "not":
-            res = "{} -".format(universe)
-        if res == "and":
-            if results[index + 1] == "not":
-                res = "-"
-                results[index + 1] = ""
-            else:
-                res = "&"
-        elif res == "or":
-            if results[index + 1] == "not":
-                res = "| ( {} -".format(universe)
-                parens_count += 1
-                results[index + 1] = ""
-            else:
-                res = "|"
-        expr_chunks.append(res)
-    expr_chunks += ")" * parens_count
-
-    match_expr = " ".join(expr_chunks)
-    log.debug("Matching expression: %s", match_expr)
-    try:
-        matched_minions = eval(match_expr)  # pylint: disable=W0123
-    except SyntaxError:
-        log.error("Looks like this target expression is failing.")
-        if "or not" in tgt:
-            log.error(
-                "This may be a salt-sproxy bug, please report at: \n"
-                "https://github.com/mirceaulinic/salt-sproxy/issues/new?"
-                "labels=bug%2C+pending+triage&template=bug_report.md"
-                "&title=Issue%20when%20using%20the%20compound%20target"
+                if ast[2] is not None
+                else set()
             )
-        return {}
+        return algebra.convert(minion for minion in memo[ast[1]] if minion in pool)
+    if oper == "not":
+        return algebra.difference(
+            algebra.universe(), _eval_compound(ast[1], pool, algebra, opts, memo, index)
+        )
+    left = _eval_compound(ast[1], pool, algebra, opts, memo, index)
+    if oper == "and":
+        if algebra.empty(left):
+            # Nothing to intersect with, no need to evaluate the right side.
+            return left
+        if ast[2][0] == "not":
+            # `X and not Y` is simply `X - Y`, no need to compute the
+            # complement of Y against the whole universe.
+            right = _eval_compound(ast[2][1], pool, algebra, opts, memo, index)
+            return algebra.difference(left, right)
+        return algebra.intersection(
+            left, _eval_compound(ast[2], pool, algebra, opts, memo, index)
+        )
+    return algebra.union(left, _eval_compound(ast[2], pool, algebra, opts, memo, index))
+
+
+def nodegroups_fingerprint(nodegroups):
+    """
+    Return a fingerprint of the nodegroups configuration, so the compiled
+    plans are invalidated when the nodegroups are changed.
+    """
+    if not nodegroups:
+        return None
+    return hashlib.sha1(
+        json.dumps(nodegroups, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def pool_fingerprint(pool):
+    """
+    Return a fingerprint of the devices in the pool, so the nodegroups
+    membership memoized for a pool is never reused against a different one.
+    """
+    digest = hashlib.sha1()
+    for minion in sorted(pool):
+        digest.update(six.text_type(minion).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+_PLAN_CACHE = collections.OrderedDict()
+_PLAN_CACHE_LOCK = threading.Lock()
+
+
+def compile_target(tgt, tgt_type="compound", opts=None):
+    """
+    Compile the target expression into a plan, i.e., the AST as returned by
+    ``compile_compound``, with the regular expressions compiled and the
+    nodegroups expanded.
+
+    The plans are kept into a bounded LRU cache, keyed by the target
+    expression, its type and the nodegroups configuration, so the recurrent
+    target expressions (e.g., when invoked through the Salt API or the
+    Reactor) don't need to be parsed over and over again. The size of the
+    cache can be adjusted using the ``target_plan_cache_size`` option
+    (default: ``256``); ``0`` disables the cache.
+    """
+    if not opts:
+        opts = {}
+    nodegroups = opts.get("nodegroups") or {}
+    cache_size = opts.get("target_plan_cache_size", 256)
+    cache_key = (
+        tuple(tgt) if isinstance(tgt, list) else tgt,
+        tgt_type,
+        nodegroups_fingerprint(nodegroups),
+    )
+    if cache_size:
+        with _PLAN_CACHE_LOCK:
+            plan = _PLAN_CACHE.get(cache_key)
+            if plan is not None:
+                _PLAN_CACHE.move_to_end(cache_key)
+                return plan
+    if tgt_type == "compound":
+        if not isinstance(tgt, six.string_types) and not isinstance(tgt, (list, tuple)):
+            raise CompoundSyntaxError(
+                "Compound target received that is neither string, list nor tuple"
+            )
+        plan = compile_compound(tgt, nodegroups)
+    elif tgt_type in ("N", "nodegroup"):
+        plan = _compile_nodegroup(tgt, nodegroups)
+    else:
+        plan = _compile_term(tgt_type, tgt)
+    log.debug("Compiled target expression %s (%s): %s", tgt, tgt_type, plan)
+    if cache_size:
+        with _PLAN_CACHE_LOCK:
+            _PLAN_CACHE[cache_key] = plan
+            while len(_PLAN_CACHE) > cache_size:
+                _PLAN_CACHE.popitem(last=False)
+    return plan
+
+
+def evaluate_plan(plan, pool, opts=None):
+    """
+    Evaluate a compiled plan (see ``compile_target``) against the pool of
+    devices, and return the matched devices together with their opts.
+
+    For pools larger than the ``target_bitset_threshold`` option (default:
+    ``20000`` devices), the sets are represented as integer bitsets indexed
+    over the device pool.
+
+    The devices matched by the nodegroups are memoized for the duration of
+    the evaluation, or, when the ``__sproxy_nodegroups`` key is set in the
+    opts, into that dictionary, under the fingerprint of the pool (see
+    ``pool_fingerprint``).
+    """
+    if not opts:
+        opts = {}
+    # The nodegroups memo can be shared by the caller for the entire job,
+    # e.g., to reuse the nodegroups membership from the target cache. The
+    # membership is only valid for the exact same pool, as the Rosters may
+    # evaluate the target against part of the devices only.
+    memo = opts.get("__sproxy_nodegroups")
+    if isinstance(memo, dict):
+        memo = memo.setdefault(pool_fingerprint(pool), {})
+    else:
+        memo = {}
+    if len(pool) >= opts.get("target_bitset_threshold", 20000):
+        algebra = _BitsetAlgebra(pool)
+    else:
+        algebra = _SetAlgebra(pool)
+    matched_minions = algebra.members(
+        _eval_compound(plan, pool, algebra, opts, memo, _GlobIndex(pool))
+    )
     log.debug("Matched Minions")
     log.debug(matched_minions)
-
     return {minion: pool[minion] for minion in matched_minions}
 
 
+def match(pool, tgt, tgt_type, opts=None):
+    """
+    Compile (or load from the plan cache) the target expression, and return
+    the devices from the pool matching it.
+    """
+    try:
+        plan = compile_target(tgt, tgt_type, opts=opts)
+    except CompoundSyntaxError as err:
+        log.error("Invalid target expression %s (%s): %s", tgt, tgt_type, err)
+        return {}
+    return evaluate_plan(plan, pool, opts=opts)
+
+
+def compound(pool, tgt, opts=None):
+    """
+    Execute a compound match on a pool of devices returned by the Roster. The
+    Roster module must collect the entire list of devices managed by this Master
+    / salt-sproxy instance, and this function helps filtering out the Minions
+    that are outside of this target expression.
+    This function returns the list of Minions matched by the target expression,
+    together with their opts (i.e., extra Grains and Pillar).
+    The first argument passed in is ``pool`` which is a dictionary containing
+    the total group of devices that can possibly be managed, and their opts.
+
+    The target expression is compiled into a plan (see ``compile_target``),
+    which is then evaluated using set operations (see ``evaluate_plan``).
+    """
+    return match(pool, tgt, "compound", opts=opts)
+
+
 TGT_FUN["compound"] = compound
@@ -86,21 +86,60 @@ This is the format that an inventory script needs to output to work with ansible
             True
 
 Any of the [groups] or direct hostnames will return.  The 'all' is special, and returns everything.
+
+The output of ``ansible-inventory`` is cached, so the inventory is not
+re-compiled on every run (or Salt API request) when it hasn't been changed.
+For static inventory files, the cache is invalidated as soon as the
+inventory file, or any file under the ``group_vars`` and ``host_vars``
+directories next to it, are changed. The output of the dynamic inventory
+scripts (i.e., executable inventory files) is cached for a limited amount of
+time only. These can be adjusted under the ``roster_ansible`` option in the
+Master configuration:
+
+native: ``True``
+    Parse the static inventory files (INI or YAML) in-process, without
+    invoking ``ansible-inventory`` - in which case Ansible doesn't need to be
+    installed. The ``ansible-inventory`` program is still required for the
+    dynamic inventory scripts, as well as the inventory plugins (e.g., YAML
+    files with a ``plugin`` key), or when the inventory can't be parsed.
+
+cache: ``True``
+    Whether to cache the inventory.
+
+cache_ttl: ``60``
+    The time (in seconds) to cache the output of a dynamic inventory script.
+
+.. code-block:: yaml
+
+    roster_ansible:
+      cache_ttl: 300
 """
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
-import copy
+import os
+import re
+import ast
 import json
+import time
+import shlex
+import string
+import hashlib
 import logging
 
 # Import Salt libs
+import salt.cache
+from salt.exceptions import CommandExecutionError
 from salt.roster import get_roster_file
 
 try:
+    from salt.utils.files import fopen
     from salt.utils.path import which as utils_which
+    from salt.utils.yamlloader import safe_load
     from salt.utils.stringutils import to_str as utils_to_str
 except ImportError:
+    from salt.utils import fopen
     from salt.utils import which as utils_which
+    from salt.utils.yamlloader import load as safe_load
     from salt.utils import to_str as utils_to_str
 
 # Import salt-sproxy modules
@@ -121,10 +160,9 @@ __virtualname__ = "ansible"
 
 
 def __virtual__():
-    return (
-        utils_which("ansible-inventory") and __virtualname__,
-        "Install `ansible` to use inventory",
-    )
+    # The static inventories can be parsed without Ansible being installed,
+    # the ansible-inventory program is checked only when required.
+    return __virtualname__
 
 
 def targets(tgt, tgt_type="glob", **kwargs):
@@ -132,10 +170,9 @@ def targets(tgt, tgt_type="glob", **kwargs):
     Return the targets from the ansible inventory_file
     Default: /etc/salt/roster
     """
-    inventory = __runner__["salt.cmd"](
-        "cmd.run", "ansible-inventory -i {0} --list".format(get_roster_file(__opts__))
+    __context__["inventory"], __context__["groups"] = _load_inventory(
+        get_roster_file(__opts__)
     )
-    __context__["inventory"] = json.loads(utils_to_str(inventory))
 
     if tgt_type == "nodegroup":
         hosts = _get_hosts_from_group(tgt)
@@ -151,20 +188,409 @@ def targets(tgt, tgt_type="glob", **kwargs):
 
 
 def _get_hosts_from_group(group):
-    inventory = __context__["inventory"]
-    hosts = [host for host in inventory.get(group, {}).get("hosts", [])]
-    for child in inventory.get(group, {}).get("children", []):
-        hosts.extend(_get_hosts_from_group(child))
-    return hosts
+    return __context__["groups"].get(group, [])
+
+
+def _group_index(inventory):
+    """
+    Build the index of the hosts under each group, including the hosts of
+    the child groups (recursively), without duplicates.
+    """
+    index = {}
+    visiting = set()
+
+    def _index(group):
+        if group in index:
+            return index[group]
+        if group in visiting:
+            log.error("Circular reference detected for the group %s", group)
+            return []
+        visiting.add(group)
+        hosts = list(inventory.get(group, {}).get("hosts", []))
+        seen = set(hosts)
+        for child in inventory.get(group, {}).get("children", []):
+            for host in _index(child):
+                if host not in seen:
+                    seen.add(host)
+                    hosts.append(host)
+        visiting.discard(group)
+        index[group] = hosts
+        return hosts
+
+    for group in inventory:
+        if group != "_meta":
+            _index(group)
+    return index
 
 
 def _get_hostvars(host):
     hostvars = __context__["inventory"]["_meta"].get("hostvars", {}).get(host, {})
-    ret = copy.deepcopy(__opts__.get("roster_defaults", {}))
-    for key, value in CONVERSION.items():
-        if key in hostvars:
-            ret[value] = hostvars.pop(key)
-    ret["minion_opts"] = hostvars
+    # The roster_defaults are shared between the hosts (a shallow copy only),
+    # as they are not altered in place.
+    ret = dict(__opts__.get("roster_defaults", {}))
+    minion_opts = {}
+    for key, value in hostvars.items():
+        if key in CONVERSION:
+            ret[CONVERSION[key]] = value
+        else:
+            minion_opts[key] = value
+    ret["minion_opts"] = minion_opts
     if "host" not in ret:
         ret["host"] = host
     return ret
+
+
+def _run_inventory(inventory_file):
+    """
+    Compile the inventory using the ``ansible-inventory`` program.
+    """
+    if not utils_which("ansible-inventory"):
+        raise CommandExecutionError(
+            "Install `ansible` to use the inventory {}".format(inventory_file)
+        )
+    inventory = __runner__["salt.cmd"](
+        "cmd.run", "ansible-inventory -i {0} --list".format(inventory_file)
+    )
+    return json.loads(utils_to_str(inventory))
+
+
+def _load_inventory(inventory_file):
+    """
+    Load the inventory and the group membership index from the cache when
+    available and still valid, otherwise compile and cache them.
+    """
+    roster_opts = __opts__.get("roster_ansible", {})
+    dynamic = os.access(inventory_file, os.X_OK)
+    if not roster_opts.get("cache", True):
+        inventory = _compile_inventory(inventory_file, dynamic)
+        return inventory, _group_index(inventory)
+    fingerprint = salt_sproxy._roster.file_fingerprint(
+        *salt_sproxy._roster.inventory_files(inventory_file)
+    )
+    cache = salt.cache.factory(__opts__)
+    cache_key = "ansible_{}".format(
+        hashlib.sha1(os.path.abspath(inventory_file).encode()).hexdigest()
+    )
+    cached = cache.fetch("_salt_sproxy_roster", cache_key)
+    if (
+        cached
+        and cached.get("fingerprint") == fingerprint
+        and "groups" in cached
+        and (
+            not dynamic
+            or time.time() - cached["time"] <= roster_opts.get("cache_ttl", 60)
+        )
+    ):
+        log.debug("Loading the Ansible inventory from the cache")
+        return (
+            salt_sproxy._roster.loads_compact(cached["inventory"]),
+            salt_sproxy._roster.loads_compact(cached["groups"]),
+        )
+    inventory = _compile_inventory(inventory_file, dynamic)
+    groups = _group_index(inventory)
+    cache.store(
+        "_salt_sproxy_roster",
+        cache_key,
+        {
+            "time": time.time(),
+            "fingerprint": fingerprint,
+            "inventory": salt_sproxy._roster.dumps_compact(inventory),
+            "groups": salt_sproxy._roster.dumps_compact(groups),
+        },
+    )
+    return inventory, groups
+
+
+def _compile_inventory(inventory_file, dynamic):
+    """
+    Compile the inventory, natively for static inventory files, otherwise
+    using ``ansible-inventory``.
+    """
+    if not dynamic and __opts__.get("roster_ansible", {}).get("native", True):
+        try:
+            return _parse_inventory(inventory_file)
+        except ValueError as err:
+            log.info(
+                "Unable to parse %s natively (%s), trying ansible-inventory",
+                inventory_file,
+                err,
+            )
+    return _run_inventory(inventory_file)
+
+
+# ------------------------------------------------------------------------------
+# native inventory parser
+# ------------------------------------------------------------------------------
+
+_RANGE_RGX = re.compile(r"^(.*?)\[([^\]]*:[^\]]*)\](.*)$")
+
+
+def _expand_hosts(pattern):
+    """
+    Expand the host ranges, e.g., ``sw[01:03].lon`` becomes ``sw01.lon``,
+    ``sw02.lon``, ``sw03.lon``. The ranges can be numeric (with an optional
+    step, e.g., ``[1:10:2]``) or alphabetic (e.g., ``[a:f]``).
+    """
+    match = _RANGE_RGX.match(pattern)
+    if not match:
+        return [pattern]
+    head, bounds, tail = match.groups()
+    bounds = bounds.split(":")
+    if len(bounds) not in (2, 3):
+        raise ValueError("Invalid host range: {}".format(pattern))
+    beg, end = bounds[0] or "0", bounds[1]
+    step = int(bounds[2]) if len(bounds) == 3 and bounds[2] else 1
+    if not end:
+        raise ValueError("Invalid host range, missing the end: {}".format(pattern))
+    if beg.isdigit() and end.isdigit():
+        width = len(beg) if beg.startswith("0") and len(beg) > 1 else 0
+        seq = [str(idx).zfill(width) for idx in range(int(beg), int(end) + 1, step)]
+    elif beg in string.ascii_letters and end in string.ascii_letters:
+        letters = string.ascii_letters
+        seq = list(letters[letters.index(beg) : letters.index(end) + 1 : step])
+    else:
+        raise ValueError("Invalid host range: {}".format(pattern))
+    # The tail may contain other ranges.
+    return [
+        "{}{}{}".format(head, item, expanded)
+        for item in seq
+        for expanded in _expand_hosts(tail)
+    ]
+
+
+def _parse_value(value):
+    """
+    The values of the host variables from the INI inventories are evaluated
+    as Python literals when possible, otherwise kept as strings. Same as
+    Ansible, the values from the ``[group:vars]`` sections are always kept as
+    strings.
+    """
+    try:
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
+
+
+class _Inventory(object):
+    """
+    The groups, hosts and vars collected from the static inventory, before
+    being transformed into the structure returned by ``ansible-inventory``.
+    """
+
+    def __init__(self):
+        self.groups = {}
+        self.hostvars = {}
+        # The hosts of each group, next to the ordered lists, for constant
+        # time lookups.
+        self._members = {}
+        self.group("all")
+
+    def group(self, name):
+        if name not in self.groups:
+            self.groups[name] = {"hosts": [], "children": [], "vars": {}}
+            self._members[name] = set()
+        return self.groups[name]
+
+    def add_host(self, group, pattern, hostvars=None):
+        hosts = self.group(group)["hosts"]
+        members = self._members[group]
+        for host in _expand_hosts(pattern):
+            if host not in members:
+                members.add(host)
+                hosts.append(host)
+            self.hostvars.setdefault(host, {}).update(hostvars or {})
+
+    def clear_hosts(self, group):
+        self.group(group)["hosts"] = []
+        self._members[group] = set()
+
+    def add_child(self, group, child):
+        self.group(child)
+        if child not in self.group(group)["children"]:
+            self.groups[group]["children"].append(child)
+
+
+def _parse_ini(inventory, content):
+    """
+    Parse the INI inventory format.
+    """
+    section, kind = "ungrouped", "hosts"
+    for lineno, line in enumerate(content.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith(("#", ";")):
+            continue
+        if line.startswith("[") and line.endswith("]"):
+            section, _, kind = line[1:-1].strip().partition(":")
+            kind = kind or "hosts"
+            if kind not in ("hosts", "vars", "children"):
+                raise ValueError(
+                    "Invalid section type {} at line {}".format(kind, lineno)
+                )
+            inventory.group(section)
+            continue
+        if kind == "children":
+            inventory.add_child(section, line.split()[0])
+            continue
+        if kind == "vars":
+            key, sep, value = line.partition("=")
+            if not sep:
+                raise ValueError("Expected key=value at line {}".format(lineno))
+            inventory.group(section)["vars"][key.strip()] = value.strip()
+            continue
+        tokens = shlex.split(line, comments=True)
+        hostvars = {}
+        for token in tokens[1:]:
+            key, sep, value = token.partition("=")
+            if not sep:
+                raise ValueError("Expected key=value at line {}".format(lineno))
+            hostvars[key] = _parse_value(value)
+        inventory.group(section)
+        inventory.add_host(section, tokens[0], hostvars)
+
+
+def _parse_yaml_group(inventory, name, data):
+    """
+    Parse a group from the YAML inventory format.
+    """
+    inventory.group(name)
+    if not data:
+        return
+    if not isinstance(data, dict):
+        raise ValueError("Invalid definition for the group {}".format(name))
+    hosts = data.get("hosts") or {}
+    if isinstance(hosts, dict):
+        for host, hostvars in hosts.items():
+            inventory.add_host(name, str(host), hostvars)
+    else:
+        for host in hosts.split() if isinstance(hosts, str) else hosts:
+            inventory.add_host(name, str(host))
+    inventory.group(name)["vars"].update(data.get("vars") or {})
+    for child, child_data in (data.get("children") or {}).items():
+        inventory.add_child(name, child)
+        _parse_yaml_group(inventory, child, child_data)
+
+
+def _load_vars_file(path):
+    """
+    Load the vars from a ``group_vars`` / ``host_vars`` file, or directory.
+    """
+    ret = {}
+    if os.path.isdir(path):
+        for filename in sorted(os.listdir(path)):
+            ret.update(_load_vars_file(os.path.join(path, filename)))
+        return ret
+    with fopen(path, "r") as fp_:
+        data = safe_load(fp_)
+    return data if isinstance(data, dict) else {}
+
+
+def _vars_dir(inventory_dir, vars_dir, name):
+    """
+    Load the vars for this group or host from the ``group_vars`` or
+    ``host_vars`` directories.
+    """
+    ret = {}
+    base = os.path.join(inventory_dir, vars_dir, name)
+    for ext in ("", ".yml", ".yaml", ".json"):
+        if os.path.exists(base + ext):
+            ret.update(_load_vars_file(base + ext))
+    return ret
+
+
+def _group_depths(groups):
+    """
+    Compute the depth of every group (``all`` being the root), which gives
+    the order the vars are applied in: the deeper groups override the vars
+    of their parents.
+    """
+    depths = {"all": 0}
+    pending = ["all"]
+    while pending:
+        group = pending.pop()
+        for child in groups[group]["children"]:
+            if depths.get(child, -1) < depths[group] + 1:
+                if depths[group] + 1 > len(groups):
+                    raise ValueError("Circular group reference: {}".format(child))
+                depths[child] = depths[group] + 1
+                pending.append(child)
+    return depths
+
+
+def _parse_inventory(inventory_file):
+    """
+    Parse a static INI or YAML inventory file, and return the same structure
+    as ``ansible-inventory --list``.
+    """
+    with fopen(inventory_file, "r") as fp_:
+        content = fp_.read()
+    inventory = _Inventory()
+    try:
+        data = safe_load(content)
+    except Exception:  # pylint: disable=broad-except
+        data = None
+    if isinstance(data, dict):
+        if "plugin" in data:
+            raise ValueError("Inventory plugins are not supported natively")
+        for group, group_data in data.items():
+            _parse_yaml_group(inventory, group, group_data)
+    else:
+        _parse_ini(inventory, content)
+    groups = inventory.groups
+    # Every group without a parent is a child of the "all" group, while the
+    # hosts without a group are under "ungrouped".
+    parented = set(child for group in groups.values() for child in group["children"])
+    for group in list(groups):
+        if group != "all" and group not in parented:
+            inventory.add_child("all", group)
+    grouped = set(
+        host
+        for name, group in groups.items()
+        if name not in ("all", "ungrouped")
+        for host in group["hosts"]
+    )
+    ungrouped = groups["all"]["hosts"] + groups.get("ungrouped", {}).get("hosts", [])
+    inventory.clear_hosts("all")
+    inventory.add_child("all", "ungrouped")
+    inventory.clear_hosts("ungrouped")
+    for host in ungrouped:
+        if host not in grouped:
+            inventory.add_host("ungrouped", host)
+    depths = _group_depths(groups)
+    inventory_dir = os.path.dirname(os.path.abspath(inventory_file))
+    group_vars = {}
+    for name, group in groups.items():
+        # The group_vars files take precedence over the vars defined in the
+        # inventory file.
+        group_vars[name] = dict(group["vars"])
+        group_vars[name].update(_vars_dir(inventory_dir, "group_vars", name))
+    host_groups = {}
+    for name, group in groups.items():
+        for host in group["hosts"]:
+            host_groups.setdefault(host, set()).add(name)
+    parents = {}
+    for name, group in groups.items():
+        for child in group["children"]:
+            parents.setdefault(child, set()).add(name)
+    ret = {"_meta": {"hostvars": {}}}
+    for host, hostvars in inventory.hostvars.items():
+        # Collect all the groups the host belongs to, directly or inherited.
+        member_of = set(["all"])
+        pending = list(host_groups.get(host, []))
+        while pending:
+            group = pending.pop()
+            if group not in member_of:
+                member_of.add(group)
+                pending.extend(parents.get(group, []))
+        merged = {}
+        for group in sorted(member_of, key=lambda grp: (depths.get(grp, 0), grp)):
+            merged.update(group_vars[group])
+        merged.update(hostvars)
+        merged.update(_vars_dir(inventory_dir, "host_vars", host))
+        ret["_meta"]["hostvars"][host] = merged
+    for name, group in groups.items():
+        ret[name] = {}
+        if group["hosts"]:
+            ret[name]["hosts"] = group["hosts"]
+        if group["children"]:
+            ret[name]["children"] = group["children"]
+    return ret
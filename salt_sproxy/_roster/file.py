@@ -6,40 +6,193 @@ To use this module, you only need to configure the --roster option to ``file``
 (on the CLI or Master config), and if the Roster SLS file is in a different
 location than ``/etc/salt/roster``, you'd also need to specify ``--roster-file``
 (or ``roster_file`` in the Master config).
+
+The rendered Roster is cached, and re-rendered only when the Roster file,
+the files it includes or imports (through the Jinja ``include``, ``import``,
+or ``from`` statements), or the renderer configuration are changed. When the
+Roster file renders differently between runs without any of the above
+changing (e.g., it pulls data from an external system through the ``salt``
+functions), declare it as dynamic, by adding the following comment in the
+Roster file:
+
+.. code-block:: jinja
+
+    {# sproxy: dynamic #}
+
+To disable the cache entirely, set ``roster_file_cache: false`` in the Master
+configuration.
+
+Instead of a single Roster file, the devices can be split into multiple
+files (shards) - e.g., one per site - under a directory: either point
+``roster_file`` to the directory, or place the shards under a ``.d``
+directory next to the Roster file, e.g., ``/etc/salt/roster.d/``. Every shard
+is rendered and cached separately, so changing one shard only re-renders that
+one, then the devices from all the shards are merged in the alphabetical
+order of the file names (i.e., when the same device is defined in multiple
+shards, the last one wins). When multiple shards need to be rendered, they
+are rendered in parallel, using up to ``roster_file_workers`` threads
+(default: the number of CPUs).
 """
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import os
+import re
+import hashlib
 import logging
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 
+import salt.cache
 import salt.loader
-from salt.roster import get_roster_file
 from salt.template import compile_template
 
+try:
+    from salt.utils.files import fopen
+except ImportError:
+    from salt.utils import fopen
+
 import salt_sproxy._roster
 
 __virtualname__ = "file"
 
 log = logging.getLogger(__name__)
 
+_RENDERERS_LOCK = threading.Lock()
 
-def targets(tgt, tgt_type="glob", **kwargs):
+_DYNAMIC_RGX = re.compile(r"^\s*(#|\{#)\s*sproxy:\s*dynamic", re.MULTILINE)
+_INCLUDE_RGX = re.compile(
+    r"\{%-?\s*(?:include|import|from)\s+['\"]([^'\"]+)['\"]", re.MULTILINE
+)
+
+
+def _template_files(template, _seen=None):
     """
-    Return the targets from the sls file, checks opts for location but
-    defaults to /etc/salt/roster
+    Return the list of files the template depends on, i.e., the template
+    itself and the files it includes or imports (recursively), as well as
+    whether the template is declared as dynamic.
     """
-    template = get_roster_file(__opts__)
-    rend = salt.loader.render(__opts__, {})
-    __runner__.name = "__salt__"
-    kwargs["__salt__"] = __runner__
-    pool = compile_template(
+    if _seen is None:
+        _seen = set()
+    _seen.add(template)
+    with fopen(template, "r") as fp_:
+        content = fp_.read()
+    dynamic = bool(_DYNAMIC_RGX.search(content))
+    for include in _INCLUDE_RGX.findall(content):
+        include_path = os.path.join(os.path.dirname(template), include)
+        if include_path in _seen or not os.path.isfile(include_path):
+            continue
+        dynamic = _template_files(include_path, _seen=_seen)[1] or dynamic
+    return sorted(_seen), dynamic
+
+
+def _render(template, **kwargs):
+    """
+    Render the Roster SLS file.
+    """
+    with _RENDERERS_LOCK:
+        if "renderers" not in __context__:
+            # Load the renderers only when required, i.e., not when loading
+            # the Roster from the cache. The Runner functions are available
+            # to the templates as ``salt``.
+            __context__["renderers"] = salt.loader.render(
+                __opts__, salt_sproxy._roster.loader_value(__runner__)
+            )
+    return compile_template(
         template,
-        rend,
+        __context__["renderers"],
         __opts__["renderer"],
         __opts__["renderer_blacklist"],
         __opts__["renderer_whitelist"],
         mask_value="passw*",
         **kwargs
     )
+
+
+def _render_cached(template, **kwargs):
+    """
+    Load the rendered Roster from the cache when the template and its
+    dependencies haven't been changed, otherwise render and cache it.
+    """
+    if not __opts__.get("roster_file_cache", True):
+        return _render(template, **kwargs)
+    files, dynamic = _template_files(template)
+    if dynamic:
+        log.debug("%s is declared dynamic, rendering", template)
+        return _render(template, **kwargs)
+    fingerprint = "{}_{}_{}_{}".format(
+        salt_sproxy._roster.file_fingerprint(*files),
+        __opts__["renderer"],
+        __opts__["renderer_blacklist"],
+        __opts__["renderer_whitelist"],
+    )
+    cache = salt.cache.factory(__opts__)
+    cache_key = "file_{}".format(
+        hashlib.sha1(os.path.abspath(template).encode()).hexdigest()
+    )
+    cached = cache.fetch("_salt_sproxy_roster", cache_key)
+    if cached and cached.get("fingerprint") == fingerprint:
+        log.debug("Loading the rendered Roster %s from the cache", template)
+        return salt_sproxy._roster.loads_compact(cached["pool"])
+    pool = _render(template, **kwargs)
+    cache.store(
+        "_salt_sproxy_roster",
+        cache_key,
+        {
+            "fingerprint": fingerprint,
+            "pool": salt_sproxy._roster.dumps_compact(pool),
+        },
+    )
+    return pool
+
+
+def _roster_files():
+    """
+    Return the list of Roster files to render: the Roster file and / or the
+    shards from the Roster directory.
+    """
+    return salt_sproxy._roster.roster_files(__opts__)
+
+
+def _render_shards(shards, **kwargs):
+    """
+    Render (or load from the cache) the Roster shards, in parallel, and merge
+    them into a single pool.
+    """
+    workers = min(
+        len(shards), __opts__.get("roster_file_workers", multiprocessing.cpu_count())
+    )
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+        futures = [
+            salt_sproxy._roster.submit(executor, _render_cached, shard, **kwargs)
+            for shard in shards
+        ]
+        rendered = [future.result() for future in futures]
+    pool = {}
+    for shard, shard_pool in zip(shards, rendered):
+        duplicates = set(pool) & set(shard_pool or {})
+        if duplicates:
+            log.warning(
+                "The following devices from %s are overriding the ones defined "
+                "previously: %s",
+                shard,
+                ", ".join(sorted(duplicates)),
+            )
+        pool.update(shard_pool or {})
+    return pool
+
+
+def targets(tgt, tgt_type="glob", **kwargs):
+    """
+    Return the targets from the sls file, checks opts for location but
+    defaults to /etc/salt/roster
+    """
+    shards = _roster_files()
+    kwargs["__salt__"] = salt_sproxy._roster.loader_value(__runner__)
+    if len(shards) == 1:
+        pool = _render_cached(shards[0], **kwargs)
+    else:
+        pool = _render_shards(shards, **kwargs)
     pool = {host: {"minion_opts": conf} for host, conf in pool.items()}
     pool = salt_sproxy._roster.load_cache(
         pool, __runner__, __opts__, tgt, tgt_type=tgt_type
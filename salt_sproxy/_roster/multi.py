@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Load the list of devices from multiple Roster sources at once.
+
+When the devices are spread across different systems, e.g., some of them are
+managed in NetBox, others in an Ansible inventory, or a Roster file, this
+module allows targeting all of them in a single run. The Rosters are loaded
+concurrently, then the devices matched by each of them are merged together.
+
+The list of Rosters is configured under the ``roster_multi`` option, in the
+order of precedence: when the same device is returned by multiple Rosters,
+the one from the Roster listed first wins. Each Roster can optionally be
+given a dictionary of options, that override the Master configuration only
+for that Roster, e.g., to point the ``file`` and ``ansible`` Rosters to
+different files through the ``roster_file`` option:
+
+.. code-block:: yaml
+
+    roster: multi
+    roster_multi:
+      rosters:
+        - netbox
+        - ansible:
+            roster_file: /etc/ansible/hosts
+        - file:
+            roster_file: /etc/salt/roster
+
+The following options can be configured under ``roster_multi``:
+
+rosters
+    The ordered list of Rosters to load the devices from.
+
+merge: ``False``
+    When the same device is returned by multiple Rosters, by default the
+    device details are taken from the Roster with the highest precedence.
+    With this option enabled, the details from all the Rosters are merged
+    together instead, the Roster listed first still having precedence.
+
+workers
+    The maximum number of Rosters to load in parallel. Default: the number
+    of Rosters.
+"""
+# Import Python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import copy
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import six
+import salt.loader
+import salt.utils.dictupdate
+from salt.exceptions import SaltInvocationError
+
+import salt_sproxy._roster
+
+__virtualname__ = "multi"
+
+log = logging.getLogger(__name__)
+
+
+def _rosters():
+    """
+    Return the list of ``(<roster name>, <opts overrides>)`` from the
+    ``roster_multi`` configuration.
+    """
+    rosters = []
+    for roster in __opts__.get("roster_multi", {}).get("rosters", []):
+        if isinstance(roster, dict):
+            for name, overrides in six.iteritems(roster):
+                rosters.append((name, overrides or {}))
+        else:
+            rosters.append((roster, {}))
+    if not rosters:
+        raise SaltInvocationError(
+            "Please provide the list of Rosters under the roster_multi option"
+        )
+    if __virtualname__ in [name for name, _ in rosters]:
+        raise SaltInvocationError(
+            "The {} Roster can't reference itself".format(__virtualname__)
+        )
+    return rosters
+
+
+def _targets(runner, roster, overrides, tgt, tgt_type, **kwargs):
+    """
+    Load the targets from one Roster, using its own copy of the opts.
+    """
+    opts = copy.copy(__opts__)
+    opts.update(overrides)
+    roster_modules = salt.loader.roster(opts, runner=runner, whitelist=[roster])
+    fun = "{}.targets".format(roster)
+    if fun not in roster_modules:
+        raise SaltInvocationError("Unable to load the {} Roster".format(roster))
+    log.debug("Loading the targets from the %s Roster", roster)
+    return roster_modules[fun](tgt, tgt_type=tgt_type, **kwargs)
+
+
+def targets(tgt, tgt_type="glob", **kwargs):
+    """
+    Return the targets from all the Rosters configured.
+    """
+    rosters = _rosters()
+    multi_opts = __opts__.get("roster_multi", {})
+    workers = multi_opts.get("workers") or len(rosters)
+    # The Runner functions are resolved here, as the __runner__ dunder would
+    # otherwise resolve against the loader of each Roster.
+    runner = salt_sproxy._roster.loader_value(__runner__)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            salt_sproxy._roster.submit(
+                executor, _targets, runner, roster, overrides, tgt, tgt_type, **kwargs
+            )
+            for roster, overrides in rosters
+        ]
+        results = [future.result() for future in futures]
+    ret = {}
+    # Merging in the reverse order of precedence, so the Rosters listed first
+    # win.
+    for (roster, _), rtargets in reversed(list(zip(rosters, results))):
+        for device, device_opts in six.iteritems(rtargets or {}):
+            if device in ret:
+                log.debug("%s is also provided by the %s Roster", device, roster)
+                if multi_opts.get("merge", False):
+                    device_opts = salt.utils.dictupdate.merge(ret[device], device_opts)
+            ret[device] = device_opts
+    return ret
@@ -29,6 +29,83 @@ database available in NetBox, you can configure another key, ``filters``, under
 
     You can use any NetBox field as a filter.
 
+The device list is retrieved page by page, with several pages being requested
+in parallel. The page size and the number of concurrent requests can be tuned
+using the ``page_size`` (default: ``1000``) and ``workers`` (default: ``4``)
+options. Note that NetBox caps the page size to its ``MAX_PAGE_SIZE`` setting
+(``1000`` by default).
+
+By default, the entire device object as returned by the API (including the
+nested objects and the config context) is made available under the ``netbox``
+Grain. In large environments this may result in a significant amount of data
+being loaded and kept around for every device. To only keep the fields you're
+actually targeting on, or using in your Pillars and templates, provide the list
+of fields under the ``fields`` option. Nested fields can be selected using the
+dot notation, e.g.,
+
+.. code-block:: yaml
+
+    netbox:
+      url: <NETBOX_URL>
+      page_size: 500
+      workers: 8
+      fields:
+        - id
+        - name
+        - site.slug
+        - role.slug
+        - platform.slug
+        - primary_ip.address
+
+.. note::
+
+    The ``name``, ``id`` and ``last_updated`` fields are always preserved, as
+    they're required to identify the devices and track changes.
+
+Besides the ``filters`` configured, the target expression is translated into
+NetBox filters, whenever possible, so only the devices that can possibly match
+are retrieved from the API:
+
+- ``list`` targets and ``glob`` targets without wildcards are looked up by
+  ``name``.
+- ``glob`` targets matching by prefix, e.g., ``edge*`` are looked up using the
+  ``name__isw`` filter.
+- Grain targets under the ``netbox`` key, e.g., ``netbox:site:slug:lon1``,
+  ``netbox:site:id:1``, or ``netbox:status:active`` are translated into the
+  equivalent NetBox filter (i.e., ``site=lon1``, ``site_id=1``,
+  ``status=active``).
+- ``pcre`` targets are looked up using the ``name__regex`` filter, when the
+  ``pushdown_regex`` option is enabled. This filter is available beginning
+  with NetBox v3.5, and note that the regular expression syntax is the one
+  supported by the database (i.e., PostgreSQL).
+
+For compound targets, the terms of the above types that are AND-ed at the top
+level of the expression are pushed down to NetBox, while the rest of the
+expression is evaluated locally on the reduced list of devices, e.g., for
+``G@netbox:site:slug:lon1 and G@netbox:role:slug:edge and not edge1*``, only
+the ``edge`` devices from ``lon1`` are retrieved, then the devices whose name
+begins with ``edge1`` are excluded.
+
+To avoid downloading the whole list of devices on every run, the NetBox Roster
+can keep a local snapshot of the devices in the Salt cache, by enabling the
+``snapshot`` option. When the snapshot exists, only the devices updated in
+NetBox since the most recent ``last_updated`` timestamp in the snapshot are
+retrieved and merged into it, which is typically a single and small API call.
+As the incremental queries can't tell which devices have been removed (or no
+longer match the ``filters``), the whole list of devices is reloaded
+periodically, every ``snapshot_reconcile`` seconds (default: ``3600``, i.e.,
+one hour). Additionally, when the snapshot is younger than
+``snapshot_max_staleness`` seconds (default: ``0``), it is used as-is without
+querying NetBox at all.
+
+.. code-block:: yaml
+
+    netbox:
+      url: <NETBOX_URL>
+      snapshot: true
+      snapshot_reconcile: 21600
+      snapshot_max_staleness: 60
+
 .. important::
 
     In NetBox v2.6 the default view permissions changed, so ``salt-sproxy`` may
@@ -42,15 +119,23 @@ database available in NetBox, you can configure another key, ``filters``, under
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
 
+import re
+import json
+import time
+import hashlib
 import logging
+import functools
+
+from concurrent.futures import ThreadPoolExecutor
 
 try:
-    import pynetbox  # pylint: disable=unused-import
+    import pynetbox
 
     HAS_PYNETBOX = True
 except ImportError:
     HAS_PYNETBOX = False
 
+import salt.cache
 import salt.utils.args
 from salt.exceptions import CommandExecutionError
 
@@ -62,6 +147,12 @@ log = logging.getLogger(__name__)
 
 AUTH_ENDPOINTS = ("secrets",)
 
+DEFAULT_PAGE_SIZE = 1000
+DEFAULT_WORKERS = 4
+
+_PREFIX_GLOB = re.compile(r"^([^*?[\]]+)\*$")
+_GLOB_CHARS = re.compile(r"[*?[]")
+
 
 def __virtual__():
     if not HAS_PYNETBOX:
@@ -69,28 +160,6 @@ def __virtual__():
     return __virtualname__
 
 
-def _setval(key, val, dict_=None, delim=":"):
-    """
-    Set a value under the dictionary hierarchy identified
-    under the key. The target 'foo:bar:baz' returns the
-    dictionary hierarchy {'foo': {'bar': {'baz': {}}}}.
-    """
-    if not dict_:
-        dict_ = {}
-    prev_hier = dict_
-    dict_hier = key.split(delim)
-    for each in dict_hier[:-1]:
-        if isinstance(each, str):
-            if each not in prev_hier:
-                prev_hier[each] = {}
-            prev_hier = prev_hier[each]
-        else:
-            prev_hier[each] = [{}]
-            prev_hier = prev_hier[each]
-    prev_hier[dict_hier[-1]] = val
-    return dict_
-
-
 def _netbox_config():
     config = __opts__.get("netbox")
     if not config:
@@ -118,6 +187,44 @@ def _strip_url_field(input_dict):
     return input_dict
 
 
+def _project_fields(input_dict, fields):
+    """
+    Return a copy of ``input_dict`` reduced to the given list of fields, each
+    field being a dot-separated path, e.g., ``site.slug``.
+    """
+    ret = {}
+    for field in fields:
+        src, dst = input_dict, ret
+        levels = field.split(".")
+        for level in levels[:-1]:
+            src = src.get(level) if isinstance(src, dict) else None
+            if not isinstance(src, dict):
+                break
+            dst = dst.setdefault(level, {})
+        else:
+            if isinstance(src, dict) and levels[-1] in src:
+                dst[levels[-1]] = src[levels[-1]]
+    return ret
+
+
+def _netbox_page(nb, url, params, limit, offset):
+    """
+    Retrieve one page of results from the NetBox API.
+    """
+    params = dict(params, limit=limit, offset=offset)
+    headers = {"Accept": "application/json"}
+    if nb.token:
+        headers["Authorization"] = "Token {}".format(nb.token)
+    try:
+        req = nb.http_session.get(url, params=params, headers=headers)
+        req.raise_for_status()
+        return req.json()
+    except Exception as err:
+        raise CommandExecutionError(
+            "Unable to retrieve {} from NetBox: {}".format(url, err)
+        )
+
+
 def _netbox_filter(app, endpoint, **kwargs):
     """
     Get a list of items from NetBox.
@@ -135,50 +242,227 @@ def _netbox_filter(app, endpoint, **kwargs):
         and clicking Filters. e.g., ``role=router``
 
     Returns a list of dictionaries.
+
+    The first page is requested in order to find out how many items there are
+    in total, then the rest of the pages are retrieved concurrently.
     """
-    ret = []
+    nb_config = _netbox_config()
     nb = _nb_obj(auth_required=True if app in AUTH_ENDPOINTS else False)
     clean_kwargs = salt.utils.args.clean_kwargs(**kwargs)
-    if not clean_kwargs:
-        nb_query = getattr(getattr(nb, app), endpoint).all()
+    if app in AUTH_ENDPOINTS:
+        # The secrets are decrypted by pynetbox using the session key, so
+        # stick to the pynetbox query in this case.
+        nb_obj = getattr(getattr(nb, app), endpoint)
+        nb_query = nb_obj.filter(**clean_kwargs) if clean_kwargs else nb_obj.all()
+        return [_strip_url_field(dict(i)) for i in nb_query or []]
+    page_size = int(nb_config.get("page_size", DEFAULT_PAGE_SIZE))
+    workers = int(nb_config.get("workers", DEFAULT_WORKERS))
+    url = "{}/{}/{}/".format(nb.base_url, app, endpoint.replace("_", "-"))
+    first = _netbox_page(nb, url, clean_kwargs, page_size, 0)
+    results = list(first.get("results", []))
+    count = first.get("count", len(results))
+    # NetBox silently reduces the page size when exceeding MAX_PAGE_SIZE, so
+    # compute the offsets from the number of items actually returned.
+    page_size = len(results) or page_size
+    offsets = list(range(page_size, count, page_size))
+    if offsets:
+        log.debug(
+            "Retrieving %d more pages of %d items from %s", len(offsets), page_size, url
+        )
+        with ThreadPoolExecutor(max_workers=max(workers, 1)) as executor:
+            pages = executor.map(
+                lambda offset: _netbox_page(nb, url, clean_kwargs, page_size, offset),
+                offsets,
+            )
+            for page in pages:
+                results.extend(page.get("results", []))
+    fields = nb_config.get("fields")
+    if fields:
+        fields = set(fields) | {"name", "id", "last_updated"}
+        return [_strip_url_field(_project_fields(i, fields)) for i in results]
+    return [_strip_url_field(i) for i in results]
+
+
+def _snapshot_key(nb_config, filters):
+    """
+    Cache key identifying the snapshot of the devices retrieved from a NetBox
+    instance, with a specific set of filters and fields.
+    """
+    snapshot_id = json.dumps(
+        {
+            "url": nb_config.get("url"),
+            "filters": filters,
+            "fields": sorted(nb_config.get("fields") or []),
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return "netbox_{}".format(hashlib.sha1(snapshot_id.encode()).hexdigest())
+
+
+def _load_devices(filters):
+    """
+    Return the list of devices matching the filters, from the local snapshot
+    when enabled, otherwise straight from NetBox.
+    """
+    nb_config = _netbox_config()
+    if not nb_config.get("snapshot"):
+        return _netbox_filter("dcim", "devices", **filters)
+    cache = salt.cache.factory(__opts__)
+    cache_key = _snapshot_key(nb_config, filters)
+    snapshot = cache.fetch("_salt_sproxy_roster", cache_key) or {}
+    now = time.time()
+    if snapshot.get("devices"):
+        devices = salt_sproxy._roster.loads_compact(snapshot["devices"])
+        if now - snapshot["time"] <= nb_config.get("snapshot_max_staleness", 0):
+            log.debug("Loading the NetBox devices from the snapshot")
+            return list(devices.values())
     else:
-        nb_query = getattr(getattr(nb, app), endpoint).filter(**clean_kwargs)
-    if nb_query:
-        ret = [_strip_url_field(dict(i)) for i in nb_query]
-    return ret
+        devices = None
+    if (
+        devices is None
+        or not snapshot.get("hwm")
+        or now - snapshot["reconciled"] > nb_config.get("snapshot_reconcile", 3600)
+    ):
+        log.debug("Retrieving the full list of devices from NetBox")
+        devices = {
+            device["id"]: device
+            for device in _netbox_filter("dcim", "devices", **filters)
+        }
+        snapshot["reconciled"] = now
+    else:
+        # Using greater-or-equal, as multiple devices may have been updated at
+        # the same time; the devices already known are simply overwritten.
+        log.debug("Retrieving the devices updated in NetBox since %s", snapshot["hwm"])
+        delta = _netbox_filter(
+            "dcim", "devices", last_updated__gte=snapshot["hwm"], **filters
+        )
+        for device in delta:
+            devices[device["id"]] = device
+    snapshot["hwm"] = max(
+        [
+            device["last_updated"]
+            for device in devices.values()
+            if device.get("last_updated")
+        ]
+        or [None]
+    )
+    snapshot["time"] = now
+    snapshot["devices"] = salt_sproxy._roster.dumps_compact(devices)
+    cache.store("_salt_sproxy_roster", cache_key, snapshot)
+    return list(devices.values())
+
+
+def _grain_filter(pattern):
+    """
+    Translate a Grain target under the ``netbox`` key into the equivalent
+    NetBox filter. Returns ``None`` when there isn't one.
+    """
+    if not pattern.startswith("netbox:") or _GLOB_CHARS.search(pattern):
+        return None
+    levels = pattern[len("netbox:") :].split(":")
+    if len(levels) == 2 and all(levels):
+        return {levels[0]: levels[1]}
+    if len(levels) == 3 and all(levels):
+        if levels[1] == "slug":
+            return {levels[0]: levels[2]}
+        if levels[1] == "id":
+            return {"{}_id".format(levels[0]): levels[2]}
+    return None
+
+
+def _term_filter(node):
+    """
+    Translate a single AST node (see ``salt_sproxy._roster.compile_compound``)
+    into NetBox filters. Returns a tuple with the filters (or ``None`` when
+    the node can't be pushed down to NetBox), and a boolean telling whether
+    the filters are exactly equivalent to the target, or only reducing the
+    list of candidate devices.
+    """
+    if node[0] != "term":
+        return None, False
+    engine, pattern = node[1], node[2]
+    if engine == "glob":
+        if not _GLOB_CHARS.search(pattern):
+            return {"name": pattern}, True
+        prefix = _PREFIX_GLOB.match(pattern)
+        if prefix:
+            # name__isw is case-insensitive, hence the glob is still evaluated.
+            return {"name__isw": prefix.group(1)}, False
+    elif engine in ("G", "grain"):
+        return _grain_filter(pattern), True
+    elif engine in ("E", "pcre") and _netbox_config().get("pushdown_regex"):
+        return {"name__regex": pattern.pattern}, False
+    return None, False
+
+
+def _conjuncts(node):
+    """
+    Flatten the top level AND-ed nodes of the AST.
+    """
+    if node[0] == "and":
+        return _conjuncts(node[1]) + _conjuncts(node[2])
+    return [node]
+
+
+def _pushdown(plan, filters):
+    """
+    Split the compiled target into the NetBox filters that can be pushed down
+    to the API, and the rest of the expression that needs to be evaluated
+    locally (``None`` when there's nothing left to evaluate).
+
+    A filter is only pushed down when it's not already set, as multiple values
+    for the same NetBox filter are OR-ed.
+    """
+    pushed = {}
+    residual = []
+    for node in _conjuncts(plan):
+        node_filter, exact = _term_filter(node)
+        if node_filter and not any(
+            key in filters or key in pushed for key in node_filter
+        ):
+            pushed.update(node_filter)
+            if exact:
+                continue
+        residual.append(node)
+    if not residual:
+        return pushed, None
+    return pushed, functools.reduce(lambda left, right: ("and", left, right), residual)
 
 
 def targets(tgt, tgt_type="glob", **kwargs):
     """
     Return the targets from NetBox.
     """
-    netbox_filters = __opts__.get("netbox", {}).get("filters", {})
+    netbox_filters = dict(__opts__.get("netbox", {}).get("filters", {}))
     netbox_filters.update(**kwargs)
-    filtered = False
-    if tgt_type == "list" or (
-        tgt_type == "glob" and not any([char in tgt for char in "*?[!"])
-    ):
-        netbox_filters["name"] = tgt
-        filtered = True
-    elif tgt_type == "grain" and tgt.startswith("netbox:"):
-        levels = tgt.split("netbox:")[1].split(":")
-        if len(levels) > 2:
-            netbox_filters[levels[0]] = _setval(":".join(levels[1:-1]), levels[-1])
-            filtered = True
-        elif len(levels) == 2:
-            netbox_filters[levels[0]] = levels[1]
-            filtered = True
+    pushed, residual = {}, None
+    # When the snapshot is enabled, it holds the devices matching the
+    # configured filters, and the target is matched locally.
+    if not _netbox_config().get("snapshot"):
+        if tgt_type == "list":
+            pushed["name"] = tgt
+        elif tgt_type in ("glob", "grain", "pcre", "compound"):
+            try:
+                plan = salt_sproxy._roster.compile_target(tgt, tgt_type, opts=__opts__)
+            except salt_sproxy._roster.CompoundSyntaxError as err:
+                log.error("Invalid target expression %s (%s): %s", tgt, tgt_type, err)
+                return {}
+            pushed, residual = _pushdown(plan, netbox_filters)
+    netbox_filters.update(pushed)
     log.debug("Querying NetBox with the following filters")
     log.debug(netbox_filters)
-    netbox_devices = _netbox_filter("dcim", "devices", **netbox_filters)
+    netbox_devices = _load_devices(netbox_filters)
     pool = {
         device["name"]: {"minion_opts": {"grains": {"netbox": device}}}
         for device in netbox_devices
     }
-    if filtered:
+    if pushed and residual is None:
         return pool
     pool = salt_sproxy._roster.load_cache(
         pool, __runner__, __opts__, tgt, tgt_type=tgt_type
     )
+    if pushed:
+        return salt_sproxy._roster.evaluate_plan(residual, pool, opts=__opts__)
     engine = salt_sproxy._roster.TGT_FUN[tgt_type]
     return engine(pool, tgt, opts=__opts__)
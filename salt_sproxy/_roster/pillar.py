@@ -21,6 +21,26 @@ saltenv: ``base``
 pillarenv
     The Pillar environment to use when compiling the Pillar data.
 
+sls
+    The list of Pillar SLS files providing the list of devices. When
+    configured, only these SLS files are compiled, instead of the entire
+    Pillar as matched by the Pillar Top file for the ``minion_id``.
+
+ext_pillar: ``True``
+    Whether to compile the External Pillars. Set this option to ``False``
+    when the list of devices is provided from SLS files only, to avoid
+    compiling the External Pillars for nothing.
+
+cache: ``True``
+    Whether to cache the list of devices. The cache is invalidated whenever
+    any file from the ``pillar_roots`` of the Pillar environment, or the
+    Pillar related configuration changes.
+
+cache_ttl: ``60``
+    When the External Pillars are compiled, the cache can't tell whether the
+    data has been changed, so the list of devices is only reused for this
+    many seconds.
+
 Configuration example:
 
 .. code-block:: yaml
@@ -34,6 +54,17 @@ With the following configuration, when executing
 ``salt-run pillar.show_pillar sproxy`` you should have under ``minions`` the
 list of devices / Minions you want to manage.
 
+Configuration example, compiling only the ``devices.sls`` file:
+
+.. code-block:: yaml
+
+    roster: pillar
+    roster_pillar:
+      minion_id: sproxy
+      sls:
+        - devices
+      ext_pillar: false
+
 .. hint::
 
     The Pillar data can either be provided as files, or using one or more
@@ -43,8 +74,17 @@ list of devices / Minions you want to manage.
 """
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import os
+import copy
+import json
+import time
+import hashlib
 import logging
 
+import salt.cache
+import salt.pillar
+import salt.utils.minions
+
 import salt_sproxy._roster
 
 __virtualname__ = "pillar"
@@ -52,6 +92,105 @@ __virtualname__ = "pillar"
 log = logging.getLogger(__name__)
 
 
+def _pillar_fingerprint(roster_opts, saltenv, pillarenv, ext_pillar):
+    """
+    Return the fingerprint of the Pillar sources: the files from the
+    ``pillar_roots`` of the environment, together with the configuration
+    options that affect the Pillar compilation.
+    """
+    env = pillarenv or saltenv
+    files = []
+    for root in __opts__.get("pillar_roots", {}).get(env, []):
+        for dirpath, _, filenames in os.walk(root):
+            files.extend(os.path.join(dirpath, filename) for filename in filenames)
+    digest = hashlib.sha1(
+        json.dumps(
+            {
+                "roster_pillar": roster_opts,
+                "saltenv": saltenv,
+                "pillarenv": pillarenv,
+                "ext_pillar": __opts__.get("ext_pillar") if ext_pillar else None,
+            },
+            sort_keys=True,
+            default=str,
+        ).encode()
+    )
+    digest.update((salt_sproxy._roster.file_fingerprint(*files) or "").encode())
+    return digest.hexdigest()
+
+
+def _compile_pillar(minion_id, saltenv, pillarenv, sls, ext_pillar):
+    """
+    Compile the Pillar, restricted to the SLS files provided (if any), and
+    optionally without the External Pillars.
+    """
+    if not sls and ext_pillar:
+        return __runner__["pillar.show_pillar"](
+            minion=minion_id, saltenv=saltenv, pillarenv=pillarenv
+        )
+    id_, grains, _ = salt.utils.minions.get_minion_data(minion_id, __opts__)
+    if grains is None:
+        grains = {"fqdn": minion_id}
+    opts = copy.copy(__opts__)
+    if not ext_pillar:
+        opts["ext_pillar"] = []
+    pillar_obj = salt.pillar.Pillar(opts, grains, id_, saltenv, pillarenv=pillarenv)
+    if not sls:
+        return pillar_obj.compile_pillar(ext=False)
+    pillar, errors = pillar_obj.render_pillar({pillarenv or saltenv: list(sls)})
+    if ext_pillar:
+        pillar, errors = pillar_obj.ext_pillar(pillar, errors=errors)
+    for error in errors:
+        log.error("Error while compiling the Pillar for the Roster: %s", error)
+    return pillar
+
+
+def _load_devices(roster_opts, minion_id, pillar_key, saltenv, pillarenv):
+    """
+    Return the list of devices from the Pillar, loaded from the cache when
+    still valid, otherwise compiled and cached.
+    """
+    sls = roster_opts.get("sls")
+    if isinstance(sls, str):
+        sls = [sls]
+    ext_pillar = roster_opts.get("ext_pillar", True)
+    if not roster_opts.get("cache", True):
+        return _compile_pillar(minion_id, saltenv, pillarenv, sls, ext_pillar)[
+            pillar_key
+        ]
+    fingerprint = _pillar_fingerprint(roster_opts, saltenv, pillarenv, ext_pillar)
+    cache = salt.cache.factory(__opts__)
+    cache_key = "pillar_{}".format(
+        hashlib.sha1(
+            json.dumps([minion_id, pillar_key, saltenv, pillarenv]).encode()
+        ).hexdigest()
+    )
+    cached = cache.fetch("_salt_sproxy_roster", cache_key)
+    if (
+        cached
+        and cached.get("fingerprint") == fingerprint
+        and (
+            not (ext_pillar and __opts__.get("ext_pillar"))
+            or time.time() - cached["time"] <= roster_opts.get("cache_ttl", 60)
+        )
+    ):
+        log.debug("Loading the list of devices from the Pillar cache")
+        return salt_sproxy._roster.loads_compact(cached["devices"])
+    devices = _compile_pillar(minion_id, saltenv, pillarenv, sls, ext_pillar)[
+        pillar_key
+    ]
+    cache.store(
+        "_salt_sproxy_roster",
+        cache_key,
+        {
+            "time": time.time(),
+            "fingerprint": fingerprint,
+            "devices": salt_sproxy._roster.dumps_compact(devices),
+        },
+    )
+    return devices
+
+
 def targets(tgt, tgt_type="glob", **kwargs):
     """
     Return the targets from External Pillar requested.
@@ -61,14 +200,18 @@ def targets(tgt, tgt_type="glob", **kwargs):
     pillar_key = roster_opts.get("pillar_key", kwargs.get("pillar_key", "devices"))
     saltenv = roster_opts.get("saltenv", kwargs.get("saltenv", "base"))
     pillarenv = roster_opts.get("pillarenv", kwargs.get("pillarenv"))
-    pillar = __runner__["pillar.show_pillar"](
-        minion=minion_id, saltenv=saltenv, pillarenv=pillarenv
+    pillar_devices = _load_devices(
+        roster_opts, minion_id, pillar_key, saltenv, pillarenv
     )
-    pillar_devices = pillar[pillar_key]
     log.debug("Compiled the following list of devices from the Pillar")
     log.debug(pillar_devices)
+    # The device dictionaries are not altered, so they can be safely shared.
     pool = {
-        device.pop("id", device.pop("name")): {"minion_opts": device}
+        device.get("id", device.get("name")): {
+            "minion_opts": {
+                key: value for key, value in device.items() if key not in ("id", "name")
+            }
+        }
         for device in pillar_devices
     }
     pool = salt_sproxy._roster.load_cache(
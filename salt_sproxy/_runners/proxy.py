@@ -21,18 +21,26 @@ collect the Grains, compile the Pillar, then execute the commands.
 from __future__ import absolute_import, print_function, unicode_literals
 
 # Import Python std lib
+import os
 import sys
 import copy
 import json
 import math
 import time
+import pickle
+import sqlite3
+import tempfile
 import hashlib
 import logging
+import datetime
 import threading
+import contextlib
+import collections
 import traceback
 import multiprocessing
 
 import six
+from six.moves import queue
 
 # Import Salt modules
 import salt.cache
@@ -41,6 +49,7 @@ import salt.client
 import salt.output
 import salt.version
 import salt.utils.jid
+import salt.utils.files
 import salt.utils.master
 
 from salt.minion import SMinion
@@ -52,6 +61,11 @@ from salt.defaults import DEFAULT_TARGET_DELIM
 
 import salt.utils.napalm
 import salt.utils.dictupdate
+import salt.utils.dictdiffer
+from salt.roster import get_roster_file
+
+import salt_sproxy._roster
+import salt_sproxy.metrics
 
 try:
     import salt.utils.platform
@@ -107,6 +121,174 @@ else:
     salt.utils.is_proxy = _is_proxy
 
 
+def _target_cache_key(tgt, tgt_type, roster, saltenv):
+    """
+    Build the key under which the targets matched are cached, unique for the
+    target expression, the Roster and the Roster file used.
+    """
+    return hashlib.sha1(
+        "{tgt}_{tgt_type}_{roster}_{roster_file}_{saltenv}".format(
+            tgt=tgt,
+            tgt_type=tgt_type,
+            roster=roster,
+            roster_file=__opts__.get("roster_file"),
+            saltenv=saltenv,
+        ).encode()
+    ).hexdigest()
+
+
+def _roster_fingerprint(roster):
+    """
+    Return the fingerprint of the Roster files, for the Roster modules loading
+    the devices from files (including the Roster shards, and the
+    ``group_vars`` / ``host_vars`` of the Ansible inventory), so the cached
+    targets are invalidated as soon as any of the files is changed.
+    """
+    if roster not in ("file", "ansible") and not __opts__.get("roster_file"):
+        return None
+    try:
+        if roster == "ansible":
+            files = salt_sproxy._roster.inventory_files(get_roster_file(__opts__))
+        else:
+            files = salt_sproxy._roster.roster_files(__opts__)
+    except (IOError, OSError):
+        return None
+    return salt_sproxy._roster.file_fingerprint(*files)
+
+
+class _NodegroupsMemo(dict):
+    """
+    The nodegroups membership, per fingerprint of the pool the nodegroups
+    have been evaluated against, remembering when each nodegroup has been
+    cached.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(_NodegroupsMemo, self).__init__(*args, **kwargs)
+        self.times = {}
+
+
+def _load_nodegroups_memo(cache_bank, cache_key, fingerprint, timeout):
+    """
+    Load the nodegroups membership previously computed and cached, skipping
+    the ones that are expired.
+    """
+    cached = cache_bank.fetch("_salt_sproxy_target", cache_key)
+    memo = _NodegroupsMemo()
+    if not cached or cached.get("fingerprint") != fingerprint:
+        return memo
+    for pool_key, nodegroups in cached.get("pools", {}).items():
+        for name, details in nodegroups.items():
+            if time.time() - details["time"] <= timeout:
+                memo.times[(pool_key, name)] = details["time"]
+                memo.setdefault(pool_key, {})[name] = set(details["members"])
+    log.debug(
+        "Loaded the cached membership for the nodegroups: %s",
+        sorted(set(name for nodegroups in memo.values() for name in nodegroups)),
+    )
+    return memo
+
+
+def _store_nodegroups_memo(cache_bank, cache_key, fingerprint, memo):
+    """
+    Cache the nodegroups membership computed while matching the target, so
+    the frequently used nodegroups resolve in constant time on the next runs.
+    """
+    now = time.time()
+    cache_bank.store(
+        "_salt_sproxy_target",
+        cache_key,
+        {
+            "fingerprint": fingerprint,
+            "pools": {
+                pool_key: {
+                    name: {
+                        "time": memo.times.get((pool_key, name), now),
+                        "members": sorted(members),
+                    }
+                    for name, members in nodegroups.items()
+                }
+                for pool_key, nodegroups in memo.items()
+                if nodegroups
+            },
+        },
+    )
+
+
+def _result_cache_key(minion_id, salt_function, arg):
+    return hashlib.sha1(
+        json.dumps(
+            [minion_id, salt_function, arg], sort_keys=True, default=repr
+        ).encode()
+    ).hexdigest()
+
+
+def _compare_with_last(minion_id, salt_function, arg, ret, retcode, diff=False):
+    """
+    Compare the return with the last successful return of the same function,
+    with the same arguments, on this device, and save the fingerprint of the
+    new return (and the return itself when ``diff`` is enabled) into the
+    cache. Returns a tuple having a boolean telling whether the return has
+    changed, and the structural diff (when ``diff`` is enabled).
+    """
+    if retcode != 0:
+        # Failed executions are always reported, and not remembered.
+        return True, None
+    try:
+        cache = salt.cache.factory(__opts__)
+        cache_key = _result_cache_key(minion_id, salt_function, arg)
+        fingerprint = hashlib.sha1(
+            json.dumps(ret, sort_keys=True, default=repr).encode()
+        ).hexdigest()
+        last = cache.fetch("_salt_sproxy_changes", cache_key) or {}
+        if last.get("fingerprint") == fingerprint:
+            return False, None
+        entry = {"fingerprint": fingerprint, "time": time.time()}
+        if diff:
+            entry["return"] = salt_sproxy._roster.dumps_compact(ret)
+        cache.store("_salt_sproxy_changes", cache_key, entry)
+    except Exception:  # pylint: disable=broad-except
+        # When unable to compare, the return is reported as changed.
+        log.warning(
+            "Unable to compare the return from %s with the last one",
+            minion_id,
+            exc_info=True,
+        )
+        return True, None
+    if not diff:
+        return True, None
+    if "return" not in last:
+        return True, {"old": None, "new": ret}
+    old = salt_sproxy._roster.loads_compact(last["return"])
+    if isinstance(old, dict) and isinstance(ret, dict):
+        return (
+            True,
+            salt.utils.dictdiffer.recursive_diff(
+                old, ret, ignore_missing_keys=False
+            ).diffs,
+        )
+    return True, {"old": old, "new": ret}
+
+
+def _load_cached_results(minions, salt_function, arg, ttl):
+    """
+    Return the results cached for the devices, for the function and arguments
+    requested, that are not older than ``ttl`` seconds, as a dictionary
+    mapping the device ID to a tuple with the return and its age.
+    """
+    cache = salt.cache.factory(__opts__)
+    now = time.time()
+    ret = {}
+    for minion_id in minions:
+        cached = cache.fetch(
+            "_salt_sproxy_result_cache",
+            _result_cache_key(minion_id, salt_function, arg),
+        )
+        if cached and now - cached["time"] <= ttl:
+            ret[minion_id] = (cached["return"], round(now - cached["time"], 3))
+    return ret
+
+
 def _salt_call_and_return(
     minion_id,
     salt_function,
@@ -116,37 +298,246 @@ def _salt_call_and_return(
     arg=None,
     jid=None,
     events=True,
+    event_queue=None,
+    changes_only=False,
+    changes_diff=False,
+    device_timings=None,
+    result_sizes=None,
     **opts
 ):
     """ """
     opts["jid"] = jid
+    timings = {}
     ret, retcode = salt_call(
         minion_id,
         salt_function,
         unreachable_devices=unreachable_devices,
         failed_devices=failed_devices,
+        timings=timings,
         **opts
     )
-    if events:
-        __salt__["event.send"](
-            "proxy/runner/{jid}/ret/{minion_id}".format(minion_id=minion_id, jid=jid),
-            {
-                "fun": salt_function,
-                "fun_args": arg,
-                "id": minion_id,
-                "jid": jid,
-                "return": ret,
-                "retcode": retcode,
-                "success": retcode == 0,
-            },
+    if device_timings is not None:
+        device_timings.append(timings)
+    if retcode == 0 and salt_function in (__opts__.get("result_cache") or {}):
+        try:
+            salt.cache.factory(__opts__).store(
+                "_salt_sproxy_result_cache",
+                _result_cache_key(minion_id, salt_function, arg),
+                {"time": time.time(), "return": ret},
+            )
+        except Exception:  # pylint: disable=broad-except
+            log.warning("Unable to cache the result from %s", minion_id, exc_info=True)
+    _process_return(
+        minion_id,
+        salt_function,
+        ret,
+        retcode,
+        ret_queue,
+        arg=arg,
+        jid=jid,
+        events=events,
+        event_queue=event_queue,
+        changes_only=changes_only,
+        changes_diff=changes_diff,
+        timings=timings,
+        result_sizes=result_sizes,
+    )
+    sys.exit(retcode)
+
+
+def _process_return(
+    minion_id,
+    salt_function,
+    ret,
+    retcode,
+    ret_queue,
+    arg=None,
+    jid=None,
+    events=True,
+    event_queue=None,
+    changes_only=False,
+    changes_diff=False,
+    timings=None,
+    result_sizes=None,
+    cache_age=None,
+):
+    """
+    Filter the return from a device (see ``changes_only`` and
+    ``changes_diff``), then hand it over to the reply receiver and to the
+    events publisher. This is used both for the fresh returns, from the device
+    processes, and for the returns served from the result cache, in which case
+    ``cache_age`` is the age of the cached return, in seconds.
+    """
+    if changes_only or changes_diff:
+        changed, diff = _compare_with_last(
+            minion_id, salt_function, arg, ret, retcode, diff=changes_diff
         )
+        if not changed:
+            log.debug("The return from %s didn't change since the last run", minion_id)
+            return
+        if diff is not None:
+            ret = diff
+    event_data = {
+        "fun": salt_function,
+        "fun_args": arg,
+        "id": minion_id,
+        "jid": jid,
+        "return": ret,
+        "retcode": retcode,
+        "success": retcode == 0,
+    }
+    if timings is not None:
+        event_data["timings"] = timings
+    if cache_age is not None:
+        event_data["cached"] = True
+        event_data["cache_age"] = cache_age
+    ret_size = None
     try:
-        ret = json.loads(json.dumps(ret))
+        ret_json = json.dumps(ret)
+        ret_size = len(ret_json)
+        if result_sizes is not None:
+            result_sizes.append(ret_size)
+        ret = json.loads(ret_json)
     except (ValueError, TypeError):
         log.error("Function return is not JSON-serializable data", exc_info=True)
         log.error(ret)
-    ret_queue.put(({minion_id: ret}, retcode))
-    sys.exit(retcode)
+    if events:
+        # The return event is published by the parent process, see
+        # ``_publish_events``.
+        event_data["return"] = ret
+        if __opts__.get("events_slim", False):
+            event_data = _slim_event(event_data, size=ret_size)
+        event_queue.put(event_data)
+    if timings is not None:
+        ret_queue.put(({minion_id: ret}, retcode, timings))
+    else:
+        ret_queue.put(({minion_id: ret}, retcode))
+
+
+def _results_bank(jid):
+    return "_salt_sproxy_results/{jid}".format(jid=jid)
+
+
+def _slim_event(event_data, size=None):
+    """
+    Store the return from the event data into the results store (see
+    ``get_result``), and return the event data without the actual return, but
+    only a reference to it, and its size. The ``size`` of the serialized
+    return is computed only when not provided.
+    """
+    cache = salt.cache.factory(__opts__)
+    bank = _results_bank(event_data["jid"])
+    cache.store(bank, event_data["id"], event_data)
+    slim = {key: value for key, value in six.iteritems(event_data) if key != "return"}
+    if size is None:
+        size = len(json.dumps(event_data["return"], default=repr))
+    slim["size"] = size
+    slim["ref"] = "{bank}/{key}".format(bank=bank, key=event_data["id"])
+    return slim
+
+
+def _prune_results():
+    """
+    Remove the results older than the ``keep_jobs_seconds`` (or
+    ``keep_jobs``, in hours) option from the results store.
+    """
+    keep_seconds = __opts__.get(
+        "keep_jobs_seconds", __opts__.get("keep_jobs", 24) * 3600
+    )
+    if not keep_seconds:
+        return
+    cache = salt.cache.factory(__opts__)
+    now = datetime.datetime.now()
+    for jid in cache.list("_salt_sproxy_results"):
+        try:
+            jid_time = datetime.datetime.strptime(jid[:14], "%Y%m%d%H%M%S")
+        except ValueError:
+            continue
+        if (now - jid_time).total_seconds() > keep_seconds:
+            log.debug("Removing the results of the job %s from the store", jid)
+            cache.flush(_results_bank(jid))
+
+
+def _publish_events(
+    event_queue,
+    jid,
+    event_send,
+    per_device=False,
+    batch_size=100,
+    batch_interval=1.0,
+    max_rate=0,
+):
+    """
+    Publish the return events collected from the device processes on the Salt
+    bus. The returns are grouped into a single ``proxy/runner/<JID>/ret``
+    event, under the ``returns`` key, for up to ``batch_size`` devices, or
+    every ``batch_interval`` seconds, whichever comes first. When
+    ``per_device`` is enabled, a separate ``proxy/runner/<JID>/ret/<ID>`` event
+    is published for every device instead. In both cases, at most
+    ``max_rate`` events are published per second (``0`` means no limit).
+
+    The queue is drained continuously into a buffer in this process, while
+    the events are published from a separate thread, so the device processes
+    never wait for their returns to be published, regardless of the rate.
+
+    The ``event_send`` function (i.e., ``event.send``) is loaded by the caller,
+    as the Salt dunders are not available from the threads started here.
+    """
+    buffer = collections.deque()
+    received = threading.Condition()
+    done = []
+    last_send = [0]
+
+    def _send(tag, data):
+        if max_rate:
+            wait = last_send[0] + 1.0 / max_rate - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            last_send[0] = time.time()
+        event_send(tag, data)
+
+    def _sender():
+        last_flush = time.time()
+        while True:
+            with received:
+                while not done and len(buffer) < batch_size:
+                    remaining = batch_interval - (time.time() - last_flush)
+                    if remaining <= 0:
+                        break
+                    received.wait(remaining)
+                batch = [buffer.popleft() for _ in range(min(len(buffer), batch_size))]
+                finished = bool(done) and not buffer
+            last_flush = time.time()
+            if batch and per_device:
+                for data in batch:
+                    _send(
+                        "proxy/runner/{jid}/ret/{minion_id}".format(
+                            minion_id=data["id"], jid=jid
+                        ),
+                        data,
+                    )
+            elif batch:
+                _send(
+                    "proxy/runner/{jid}/ret".format(jid=jid),
+                    {"jid": jid, "returns": batch},
+                )
+            if finished:
+                return
+
+    sender = threading.Thread(target=_sender)
+    sender.daemon = True
+    sender.start()
+    while True:
+        data = event_queue.get()
+        with received:
+            if data == _SENTINEL:
+                done.append(True)
+                received.notify()
+                break
+            buffer.append(data)
+            if len(buffer) >= batch_size:
+                received.notify()
+    sender.join()
 
 
 def _existing_proxy_cli_batch(
@@ -172,7 +563,8 @@ def _receive_replies_async(ret_queue, done_queue, progress_bar):
     """ """
     count = 0
     while True:
-        ret, retcode = ret_queue.get()
+        reply = ret_queue.get()
+        ret, retcode = reply[0], reply[1]
         count += 1
         if ret == _SENTINEL:
             break
@@ -193,12 +585,49 @@ def _receive_replies_async(ret_queue, done_queue, progress_bar):
     done_queue.put(_SENTINEL)
 
 
+def _receive_replies_stream(ret_queue, done_queue, progress_bar, stream_file=None):
+    """
+    Write the replies as they arrive, one compact JSON object per device and
+    per line (i.e., NDJSON), without going through the outputter. The output
+    is buffered, and flushed whenever there are no more replies waiting in the
+    queue, so the memory usage doesn't depend on the number of devices.
+    """
+    count = 0
+    if stream_file:
+        out = salt.utils.files.fopen(stream_file, "w", buffering=1048576)
+    else:
+        out = sys.stdout
+    try:
+        while True:
+            reply = ret_queue.get()
+            ret, retcode = reply[0], reply[1]
+            count += 1
+            if ret == _SENTINEL:
+                break
+            for minion_id, minion_ret in six.iteritems(ret):
+                record = {"id": minion_id, "retcode": retcode, "return": minion_ret}
+                if len(reply) > 2:
+                    record["timings"] = reply[2]
+                out.write(json.dumps(record, separators=(",", ":"), default=repr))
+                out.write("\n")
+            if ret_queue.empty():
+                out.flush()
+            if progress_bar:
+                progress_bar.update(count)
+    finally:
+        out.flush()
+        if stream_file:
+            out.close()
+    done_queue.put(_SENTINEL)
+
+
 def _receive_replies_sync(ret_queue, static_queue, done_queue, progress_bar):
     """ """
     count = 0
     cumulative_retcode = 0
     while True:
-        ret, retcode = ret_queue.get()
+        reply = ret_queue.get()
+        ret, retcode = reply[0], reply[1]
         static_queue.put((ret, retcode))
         count += 1
         if ret == _SENTINEL:
@@ -208,6 +637,105 @@ def _receive_replies_sync(ret_queue, static_queue, done_queue, progress_bar):
     done_queue.put(_SENTINEL)
 
 
+def _receive_replies_spill(ret_queue, static_queue, done_queue, progress_bar, db_path):
+    """
+    Collect the replies into a temporary SQLite database on the disk, instead
+    of keeping them in memory until the end of the execution. Only the
+    cumulative return code is eventually sent through the ``static_queue``.
+    """
+    count = 0
+    cumulative_retcode = 0
+    conn = sqlite3.connect(db_path)
+    try:
+        while True:
+            reply = ret_queue.get()
+            ret, retcode = reply[0], reply[1]
+            count += 1
+            if ret == _SENTINEL:
+                break
+            cumulative_retcode = max(cumulative_retcode, retcode)
+            conn.executemany(
+                "INSERT OR REPLACE INTO replies VALUES (?, ?, ?)",
+                [
+                    (minion_id, retcode, pickle.dumps(minion_ret))
+                    for minion_id, minion_ret in six.iteritems(ret)
+                ],
+            )
+            if ret_queue.empty():
+                conn.commit()
+            if progress_bar:
+                progress_bar.update(count)
+        conn.commit()
+    finally:
+        conn.close()
+    static_queue.put((_SENTINEL, cumulative_retcode))
+    done_queue.put(_SENTINEL)
+
+
+def _write_spilled_json(cursor, out):
+    """
+    Write the replies from the cursor as a single JSON document, one device at
+    a time, honouring the ``output_indent`` option as the ``json`` outputter
+    does, without loading all the replies in memory.
+    """
+    indent = __opts__.get("output_indent", 4)
+    sort_keys = False
+    if indent == "pretty":
+        indent, sort_keys = 4, True
+    elif not isinstance(indent, int) or indent < 0:
+        indent = None
+    if indent is None:
+        separator, opening, closing, padding = ", ", "{", "}", ""
+    else:
+        padding = " " * indent
+        separator, opening, closing = ",\n", "{\n", "\n}"
+    empty = True
+    for minion_id, _, minion_ret in cursor:
+        value = json.dumps(
+            pickle.loads(minion_ret), default=repr, indent=indent, sort_keys=sort_keys
+        )
+        if padding:
+            value = value.replace("\n", "\n" + padding)
+        out.write(opening if empty else separator)
+        out.write("{}{}: {}".format(padding, json.dumps(minion_id), value))
+        empty = False
+    out.write("{}\n" if empty else closing + "\n")
+
+
+def _print_spilled_replies(db_path):
+    """
+    Display the replies collected by ``_receive_replies_spill`` through the
+    outputter of choice, sorted by the Minion ID, one device at a time.
+
+    The ``json`` outputter renders a single document for all the devices, so
+    the document is written directly, one device at a time.
+    """
+    outputter = __opts__.get("output", "nested")
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute(
+            "SELECT minion_id, retcode, ret FROM replies ORDER BY minion_id"
+        )
+        if outputter == "json":
+            output_file = __opts__.get("output_file")
+            if output_file:
+                with salt.utils.files.fopen(output_file, "a") as out:
+                    _write_spilled_json(cursor, out)
+            else:
+                _write_spilled_json(cursor, sys.stdout)
+                sys.stdout.flush()
+            return
+        for minion_id, retcode, minion_ret in cursor:
+            salt.output.display_output(
+                {minion_id: pickle.loads(minion_ret)},
+                outputter,
+                opts=__opts__,
+                _retcode=retcode,
+            )
+    finally:
+        conn.close()
+
+
 class PingBatch(Batch):
     def __init__(
         self, opts, eauth=None, quiet=False, parser=None
@@ -245,6 +773,83 @@ class NoPingBatch(Batch):
         return self.minions, self.ping_gen, self.down_minions
 
 
+class _PhaseTimer(object):
+    """
+    Accumulate the time spent in each phase of the execution on a device.
+    """
+
+    def __init__(self):
+        self.timings = collections.OrderedDict()
+
+    @contextlib.contextmanager
+    def __call__(self, phase):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.timings[phase] = round(
+                self.timings.get(phase, 0) + time.time() - start, 6
+            )
+
+
+def _percentiles(device_timings, percentiles=(50, 90, 99)):
+    """
+    Aggregate the timings from all the devices, and return the percentiles
+    (nearest-rank), together with the maximum, per phase.
+    """
+    phases = collections.OrderedDict()
+    for timings in device_timings:
+        for phase, duration in six.iteritems(timings):
+            phases.setdefault(phase, []).append(duration)
+    ret = collections.OrderedDict()
+    for phase, durations in six.iteritems(phases):
+        durations.sort()
+        ret[phase] = collections.OrderedDict(
+            [
+                (
+                    "p{}".format(percentile),
+                    durations[
+                        max(int(math.ceil(percentile / 100.0 * len(durations))) - 1, 0)
+                    ],
+                )
+                for percentile in percentiles
+            ]
+            + [("max", durations[-1])]
+        )
+    return ret
+
+
+def _info_output(stream, stream_file):
+    """
+    Return the context where the informative messages (e.g., the summary) are
+    displayed: when streaming the results to stdout, the messages are sent to
+    stderr instead, so stdout carries only the results.
+    """
+    if stream and not stream_file:
+        return contextlib.redirect_stdout(sys.stderr)
+    return contextlib.nullcontext()
+
+
+def _print_timings(timings_summary):
+    """
+    Display the percentiles of the time spent in each phase of the execution.
+    """
+    columns = list(next(iter(timings_summary.values())).keys())
+    salt.utils.stringutils.print_cli("\n")
+    salt.utils.stringutils.print_cli("-------------------------------------------")
+    salt.utils.stringutils.print_cli("Timings (seconds)")
+    salt.utils.stringutils.print_cli("-------------------------------------------")
+    salt.utils.stringutils.print_cli(
+        "{:<12}".format("phase") + "".join("{:>10}".format(col) for col in columns)
+    )
+    for phase, values in six.iteritems(timings_summary):
+        salt.utils.stringutils.print_cli(
+            "{:<12}".format(phase)
+            + "".join("{:>10.3f}".format(values[col]) for col in columns)
+        )
+    salt.utils.stringutils.print_cli("-------------------------------------------")
+
+
 # The SProxyMinion class is back-ported from Salt 2019.2.0 (to be released soon)
 # and extended to allow more flexible options for the (pre-)loading of the
 # Pillars and the Grains.
@@ -283,8 +888,10 @@ class SProxyMinion(SMinion):
 
             salt '*' sys.reload_modules
         """
+        timer = getattr(self, "timer", None) or _PhaseTimer()
         if self.opts.get("proxy_preload_grains", True):
-            loaded_grains = salt.loader.grains(self.opts)
+            with timer("grains"):
+                loaded_grains = salt.loader.grains(self.opts)
             self.opts["grains"].update(loaded_grains)
 
         if (
@@ -311,13 +918,14 @@ class SProxyMinion(SMinion):
             initial_grains = salt.utils.dictupdate.merge(cached_grains, initial_grains)
 
         if self.opts.get("proxy_load_pillar", True):
-            self.opts["pillar"] = salt.pillar.get_pillar(
-                self.opts,
-                initial_grains,
-                self.opts["id"],
-                saltenv=self.opts["saltenv"],
-                pillarenv=self.opts.get("pillarenv"),
-            ).compile_pillar()
+            with timer("pillar"):
+                self.opts["pillar"] = salt.pillar.get_pillar(
+                    self.opts,
+                    initial_grains,
+                    self.opts["id"],
+                    saltenv=self.opts["saltenv"],
+                    pillarenv=self.opts.get("pillarenv"),
+                ).compile_pillar()
 
         if self.opts["roster_opts"] and self.opts.get("proxy_merge_roster_opts", True):
             if "proxy" not in self.opts["pillar"]:
@@ -365,26 +973,27 @@ class SProxyMinion(SMinion):
 
         # Then load the proxy module
         fq_proxyname = self.opts["proxy"]["proxytype"]
-        self.utils = salt.loader.utils(self.opts)
-        self.proxy = salt.loader.proxy(
-            self.opts, utils=self.utils, whitelist=[fq_proxyname]
-        )
-        self.functions = salt.loader.minion_mods(
-            self.opts, utils=self.utils, notify=False, proxy=self.proxy
-        )
-        self.functions.pack["__grains__"] = copy.deepcopy(self.opts["grains"])
+        with timer("loader"):
+            self.utils = salt.loader.utils(self.opts)
+            self.proxy = salt.loader.proxy(
+                self.opts, utils=self.utils, whitelist=[fq_proxyname]
+            )
+            self.functions = salt.loader.minion_mods(
+                self.opts, utils=self.utils, notify=False, proxy=self.proxy
+            )
+            self.functions.pack["__grains__"] = copy.deepcopy(self.opts["grains"])
 
-        self.functions.pack["__proxy__"] = self.proxy
-        self.proxy.pack["__salt__"] = self.functions
-        self.proxy.pack["__pillar__"] = self.opts["pillar"]
+            self.functions.pack["__proxy__"] = self.proxy
+            self.proxy.pack["__salt__"] = self.functions
+            self.proxy.pack["__pillar__"] = self.opts["pillar"]
 
-        # No need to inject the proxy into utils, as we don't need scheduler for
-        # this sort of short living Minion.
-        # self.utils = salt.loader.utils(self.opts, proxy=self.proxy)
-        self.proxy.pack["__utils__"] = self.utils
+            # No need to inject the proxy into utils, as we don't need scheduler for
+            # this sort of short living Minion.
+            # self.utils = salt.loader.utils(self.opts, proxy=self.proxy)
+            self.proxy.pack["__utils__"] = self.utils
 
-        # Reload all modules so all dunder variables are injected
-        self.proxy.reload_modules()
+            # Reload all modules so all dunder variables are injected
+            self.proxy.reload_modules()
 
         if self.opts.get("proxy_no_connect", False):
             log.info("Requested not to initialize the connection with the device")
@@ -412,7 +1021,8 @@ class SProxyMinion(SMinion):
 
             proxy_init_fn = self.proxy[fq_proxyname + ".init"]
             try:
-                proxy_init_fn(self.opts)
+                with timer("proxy_init"):
+                    proxy_init_fn(self.opts)
                 self.connected = True
             except Exception as exc:
                 log.error(
@@ -433,16 +1043,18 @@ class SProxyMinion(SMinion):
                 # key in the opts.
                 # After loading, merge with the previous loaded grains, which
                 # may contain other grains from different sources, e.g., roster.
-                loaded_grains = salt.loader.grains(self.opts, proxy=self.proxy)
+                with timer("grains"):
+                    loaded_grains = salt.loader.grains(self.opts, proxy=self.proxy)
                 self.opts["grains"] = salt.utils.dictupdate.merge(grains, loaded_grains)
             if self.opts.get("proxy_load_pillar", True):
-                self.opts["pillar"] = salt.pillar.get_pillar(
-                    self.opts,
-                    self.opts["grains"],
-                    self.opts["id"],
-                    saltenv=self.opts["saltenv"],
-                    pillarenv=self.opts.get("pillarenv"),
-                ).compile_pillar()
+                with timer("pillar"):
+                    self.opts["pillar"] = salt.pillar.get_pillar(
+                        self.opts,
+                        self.opts["grains"],
+                        self.opts["id"],
+                        saltenv=self.opts["saltenv"],
+                        pillarenv=self.opts.get("pillarenv"),
+                    ).compile_pillar()
             self.functions.pack["__opts__"] = self.opts
             self.functions.pack["__grains__"] = copy.deepcopy(self.opts["grains"])
             self.functions.pack["__pillar__"] = copy.deepcopy(self.opts["pillar"])
@@ -468,18 +1080,19 @@ class SProxyMinion(SMinion):
         self.module_executors = self.proxy.get(
             "{0}.module_executors".format(fq_proxyname), lambda: []
         )() or self.opts.get("module_executors", [])
-        if self.module_executors:
-            self.executors = salt.loader.executors(
-                self.opts, self.functions, proxy=self.proxy
-            )
+        with timer("loader"):
+            if self.module_executors:
+                self.executors = salt.loader.executors(
+                    self.opts, self.functions, proxy=self.proxy
+                )
 
-        # Late load the Returners, as they might need Grains, which may not be
-        # properly or completely loaded before this.
-        self.returners = None
-        if self.opts["returner"]:
-            self.returners = salt.loader.returners(
-                self.opts, self.functions, proxy=self.proxy
-            )
+            # Late load the Returners, as they might need Grains, which may not
+            # be properly or completely loaded before this.
+            self.returners = None
+            if self.opts["returner"]:
+                self.returners = salt.loader.returners(
+                    self.opts, self.functions, proxy=self.proxy
+                )
         self.proxy.pack["__ret__"] = self.returners
 
         self.ready = True
@@ -487,12 +1100,13 @@ class SProxyMinion(SMinion):
 
 class StandaloneProxy(SProxyMinion):
     def __init__(
-        self, opts, unreachable_devices=None
+        self, opts, unreachable_devices=None, timer=None
     ):  # pylint: disable=super-init-not-called
         self.opts = opts
         self.connected = False
         self.ready = False
         self.unreachable_devices = unreachable_devices
+        self.timer = timer or _PhaseTimer()
         self.gen_modules()
 
 
@@ -531,6 +1145,7 @@ def salt_call(
     returner_config="",
     returner_kwargs=None,
     args=(),
+    timings=None,
     **kwargs
 ):
     """
@@ -602,6 +1217,12 @@ def salt_call(
     arg
         The list of arguments to send to the Salt function.
 
+    timings: ``None``
+        A dictionary to fill in with the time spent (in seconds) in each phase
+        of the execution: ``setup``, ``grains``, ``pillar``, ``loader``,
+        ``proxy_init``, ``function``, ``shutdown``, ``returner``,
+        ``cache_store``, and ``total``.
+
     kwargs
         Key-value arguments to send to the Salt function.
 
@@ -612,6 +1233,8 @@ def salt_call(
         salt-run proxy.salt_call bgp.neighbors junos 1.2.3.4 test test123
         salt-run proxy.salt_call net.load_config junos 1.2.3.4 test test123 text='set system ntp peer 1.2.3.4'
     """
+    start = time.time()
+    timer = _PhaseTimer()
     opts = copy.deepcopy(__opts__)
     opts["id"] = minion_id
     opts["pillarenv"] = __opts__.get("pillarenv", "base")
@@ -650,7 +1273,12 @@ def salt_call(
     for opt, val in six.iteritems(minion_defaults):
         if opt not in opts:
             opts[opt] = val
-    sa_proxy = StandaloneProxy(opts, unreachable_devices)
+    timer.timings["setup"] = round(time.time() - start, 6)
+    try:
+        sa_proxy = StandaloneProxy(opts, unreachable_devices, timer=timer)
+    finally:
+        if timings is not None:
+            timings.update(timer.timings)
     if not sa_proxy.ready:
         log.debug(
             "The SProxy Minion for %s is not able to start up, aborting", opts["id"]
@@ -661,20 +1289,21 @@ def salt_call(
     retcode = 0
     executors = getattr(sa_proxy, "module_executors")
     try:
-        if executors:
-            for name in executors:
-                ex_name = "{}.execute".format(name)
-                if ex_name not in sa_proxy.executors:
-                    raise SaltInvocationError(
-                        "Executor '{0}' is not available".format(name)
+        with timer("function"):
+            if executors:
+                for name in executors:
+                    ex_name = "{}.execute".format(name)
+                    if ex_name not in sa_proxy.executors:
+                        raise SaltInvocationError(
+                            "Executor '{0}' is not available".format(name)
+                        )
+                    ret = sa_proxy.executors[ex_name](
+                        opts, {"fun": salt_function}, salt_function, args, kwargs
                     )
-                ret = sa_proxy.executors[ex_name](
-                    opts, {"fun": salt_function}, salt_function, args, kwargs
-                )
-                if ret is not None:
-                    break
-        else:
-            ret = sa_proxy.functions[salt_function](*args, **kwargs)
+                    if ret is not None:
+                        break
+            else:
+                ret = sa_proxy.functions[salt_function](*args, **kwargs)
         retcode = sa_proxy.functions.pack["__context__"].get("retcode", 0)
     except Exception as err:
         log.info("Exception while running %s on %s", salt_function, opts["id"])
@@ -690,7 +1319,8 @@ def salt_call(
     finally:
         if sa_proxy.connected:
             shut_fun = "{}.shutdown".format(sa_proxy.opts["proxy"]["proxytype"])
-            sa_proxy.proxy[shut_fun](opts)
+            with timer("shutdown"):
+                sa_proxy.proxy[shut_fun](opts)
     if returner:
         returner_fun = "{}.returner".format(returner)
         if returner_fun in sa_proxy.returners:
@@ -709,7 +1339,8 @@ def salt_call(
                 "ret_kwargs": returner_kwargs,
             }
             try:
-                sa_proxy.returners[returner_fun](ret_data)
+                with timer("returner"):
+                    sa_proxy.returners[returner_fun](ret_data)
             except Exception as err:
                 log.error(
                     "Exception while sending the response from %s to the %s returner",
@@ -729,12 +1360,47 @@ def salt_call(
     if cache_pillar:
         log.debug("Caching Pillar for %s", minion_id)
         cache_data["pillar"] = copy.deepcopy(sa_proxy.opts["pillar"])
-    cached_store = __salt__["cache.store"](
-        "minions/{}".format(minion_id), "data", cache_data
-    )
+    with timer("cache_store"):
+        cached_store = __salt__["cache.store"](
+            "minions/{}".format(minion_id), "data", cache_data
+        )
+    timer.timings["total"] = round(time.time() - start, 6)
+    if timings is not None:
+        timings.update(timer.timings)
     return ret, retcode
 
 
+def get_result(jid, minion_id=None):
+    """
+    Return the result of a job from the results store, when executed with the
+    ``events_slim`` option enabled. The return events only carry a reference
+    to the result, i.e., ``_salt_sproxy_results/<JID>/<ID>``.
+
+    jid
+        The ID of the job.
+
+    minion_id: ``None``
+        The ID of the device. When not specified, returns the results from all
+        the devices, while the summary of the job can be retrieved using
+        ``__summary__`` as the device ID.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt-run proxy.get_result 20190529143434054424 juniper-router
+    """
+    cache = salt.cache.factory(__opts__)
+    bank = _results_bank(jid)
+    if minion_id:
+        return cache.fetch(bank, minion_id)
+    return {
+        minion: cache.fetch(bank, minion)
+        for minion in cache.list(bank)
+        if minion != "__summary__"
+    }
+
+
 def execute_devices(
     minions,
     salt_function,
@@ -772,6 +1438,13 @@ def execute_devices(
     returner="",
     returner_config="",
     returner_kwargs=None,
+    stream=False,
+    stream_file=None,
+    static_spill=False,
+    changes_only=False,
+    changes_diff=False,
+    use_result_cache=True,
+    show_timings=False,
     **kwargs
 ):
     """
@@ -823,6 +1496,45 @@ def execute_devices(
         Whether to return the results synchronously (or return them as soon
         as the device replies).
 
+    stream: ``False``
+        Write the results as soon as the devices reply, as one compact JSON
+        object per line, with the ``id``, ``retcode``, ``return``, and
+        ``timings`` keys, bypassing the outputter. Takes precedence over
+        ``static``.
+
+    stream_file: ``None``
+        Write the streamed results into this file instead of the standard
+        output.
+
+    static_spill: ``False``
+        When returning the results synchronously (i.e., ``static=True``),
+        collect them into a temporary file on the disk, then print them sorted
+        by the Minion ID, instead of returning them. This keeps the memory
+        usage bounded regardless of the number of devices.
+
+    changes_only: ``False``
+        Only output (and publish the events for) the devices whose return is
+        different from their last successful return of the same function with
+        the same arguments. The fingerprints of the returns are kept in the
+        cache, under the ``_salt_sproxy_changes`` bank.
+
+    changes_diff: ``False``
+        Same as ``changes_only``, but output the structural differences from
+        the previous return, instead of the complete return.
+
+    use_result_cache: ``True``
+        Serve the results from the cache, when available and not expired, for
+        the functions configured under the ``result_cache`` option, without
+        connecting to the devices. The return events of the results served
+        from the cache are marked with the ``cached`` and ``cache_age`` (in
+        seconds) keys, and the devices are listed under ``cached_minions`` in
+        the summary event.
+
+    show_timings: ``False``
+        Display the percentiles of the time spent in each phase of the
+        execution (e.g., Pillar compilation, connection, function execution,
+        etc.) across all the devices.
+
     events: ``True``
         Whether should push events on the Salt bus, similar to when executing
         equivalent through the ``salt`` command.
@@ -866,6 +1578,7 @@ def execute_devices(
     if not __pub_user:
         __pub_user = __utils__["user.get_specific_user"]()
     kwargs = clean_kwargs(**kwargs)
+    job_start = time.time()
     if not jid:
         if salt.version.__version_info__ >= (2018, 3, 0):
             jid = salt.utils.jid.gen_jid(__opts__)
@@ -928,342 +1641,491 @@ def execute_devices(
         )
     ret_queue = multiprocessing.Queue()
     done_queue = multiprocessing.Queue()
-    if not static:
-        thread = threading.Thread(
-            target=_receive_replies_async, args=(ret_queue, done_queue, progress_bar)
-        )
-        thread.daemon = True
-        thread.start()
-    else:
-        static_queue = multiprocessing.Queue()
-        thread = threading.Thread(
-            target=_receive_replies_sync,
-            args=(ret_queue, static_queue, done_queue, progress_bar),
-        )
-        thread.daemon = True
-        thread.start()
-
-    ret = {}
-    sproxy_minions = list(set(minions) - set(existing_minions))
-    if batch_size:
-        if "%" in str(batch_size):
-            percent = int(batch_size.replace("%", ""))
-            batch_size = len(minions) * percent / 100
-        batch_size = int(batch_size)
-        batch_count = int(len(minions) / batch_size) + (
-            1 if len(minions) % batch_size else 0
-        )
-        existing_batch_size = int(
-            math.ceil(len(existing_minions) * batch_size / float(len(minions)))
-        )
-        sproxy_batch_size = batch_size - existing_batch_size
-    else:
-        # when no explicit batch requested, we'll execute the command on the
-        # existing minions without any batching (i.e., on all the matched
-        # minions at once), while sproxy ones are executed in as many CPUs are
-        # available.
-        sproxy_batch_size = multiprocessing.cpu_count()
-        existing_batch_size = len(existing_minions)
-        batch_count = int(len(sproxy_minions) / sproxy_batch_size) + (
-            1 if len(sproxy_minions) % sproxy_batch_size else 0
+    event_queue = None
+    if events and __opts__.get("events_slim", False):
+        _prune_results()
+    if events:
+        # The return events are aggregated and published from here, instead of
+        # each device process connecting to the Salt bus separately.
+        event_queue = multiprocessing.Queue()
+        event_thread = threading.Thread(
+            target=_publish_events,
+            args=(event_queue, jid, __salt__["event.send"]),
+            kwargs={
+                "per_device": __opts__.get("events_per_device", False),
+                "batch_size": __opts__.get("events_batch_size", 100),
+                "batch_interval": __opts__.get("events_batch_interval", 1.0),
+                "max_rate": __opts__.get("events_max_rate", 0),
+            },
         )
-    cli_batch = None
-    if existing_batch_size > 0:
-        # When there are existing Minions matching the target, use the native
-        # batching function to execute against these Minions.
-        log.debug("Executing against the existing Minions")
-        log.debug(existing_minions)
-        batch_opts = copy.deepcopy(__opts__)
-        batch_opts["batch"] = str(existing_batch_size)
-        batch_opts["tgt"] = existing_minions
-        batch_opts["tgt_type"] = "list"
-        batch_opts["fun"] = salt_function
-        batch_opts["arg"] = event_args
-        batch_opts["batch_wait"] = batch_wait
-        batch_opts["selected_target_option"] = "list"
-        batch_opts["return"] = returner
-        batch_opts["ret_config"] = returner_config
-        batch_opts["ret_kwargs"] = returner_kwargs
-        if test_ping:
-            cli_batch = PingBatch(batch_opts, quiet=True)
-            (
-                cli_batch.minions,
-                cli_batch.ping_gen,
-                cli_batch.down_minions,
-            ) = cli_batch.gather_minions()
-            cli_batch.gather_minions = cli_batch._gather_minions
+        event_thread.daemon = True
+        event_thread.start()
+    spill_path = None
+    try:
+        if stream:
+            static = False
+            thread = threading.Thread(
+                target=_receive_replies_stream,
+                args=(ret_queue, done_queue, progress_bar, stream_file),
+            )
+            thread.daemon = True
+            thread.start()
+        elif not static:
+            thread = threading.Thread(
+                target=_receive_replies_async,
+                args=(ret_queue, done_queue, progress_bar),
+            )
+            thread.daemon = True
+            thread.start()
+        elif static_spill:
+            static_queue = multiprocessing.Queue()
+            spill_fd, spill_path = tempfile.mkstemp(prefix="sproxy-", suffix=".db")
+            os.close(spill_fd)
+            conn = sqlite3.connect(spill_path)
+            conn.execute(
+                "CREATE TABLE replies (minion_id TEXT PRIMARY KEY, retcode INTEGER, ret BLOB)"
+            )
+            conn.close()
+            thread = threading.Thread(
+                target=_receive_replies_spill,
+                args=(ret_queue, static_queue, done_queue, progress_bar, spill_path),
+            )
+            thread.daemon = True
+            thread.start()
         else:
-            cli_batch = NoPingBatch(batch_opts, quiet=True)
-        log.debug("Batching detected the following Minions responsive")
-        log.debug(cli_batch.minions)
-        if cli_batch.down_minions:
-            log.warning(
-                "The following existing Minions connected to the Master "
-                "seem to be unresponsive: %s",
-                ", ".join(cli_batch.down_minions),
+            static_queue = multiprocessing.Queue()
+            thread = threading.Thread(
+                target=_receive_replies_sync,
+                args=(ret_queue, static_queue, done_queue, progress_bar),
             )
-            down_minions = cli_batch.down_minions
-            for minion in down_minions:
-                ret_queue.put(
-                    (
-                        {minion: "Minion did not return. [Not connected]"},
-                        salt.defaults.exitcodes.EX_UNAVAILABLE,
-                    )
-                )
-
-    log.info(
-        "%d devices matched the target, executing in %d batches",
-        len(minions),
-        batch_count,
-    )
-    batch_stop_queue = multiprocessing.Queue()
-    sproxy_stop_queue = multiprocessing.Queue()
-    # This dance with the batch_stop_queue and sproxy_stop_queue is necessary
-    # in order to make sure the execution stops at the same time (either at the
-    # very end, or when the iteration must be interrupted - e.g., due to
-    # failhard condition).
-    # sproxy_stop_queue signalises to the batch execution that the sproxy
-    # sequence is over (not under normal circumstances, but interrupted forcibly
-    # therefore it tells to the batch to stop immediately). In a similar way,
-    # batch_stop_queue is required at the very end to make sure we're sending
-    # the sentinel signaling at the very end for the display thread -- for
-    # example there can be situations when the sproxy execution may be empty as
-    # all the targets are existing proxies, so the display must wait.
-    if cli_batch:
-        existing_proxy_thread = threading.Thread(
-            target=_existing_proxy_cli_batch,
-            args=(cli_batch, ret_queue, batch_stop_queue, sproxy_stop_queue),
-        )
-        existing_proxy_thread.daemon = True
-        existing_proxy_thread.start()
-    else:
-        # If there's no batch to execute (i.e., no existing devices to run
-        # against), just need to signalise that there's no need to wait for this
-        # one to complete.
-        batch_stop_queue.put(0)
-
-    log.debug(
-        "Executing sproxy normal run on the following devices (%d batch size):",
-        sproxy_batch_size,
-    )
-    log.debug(sproxy_minions)
-
-    with multiprocessing.Manager() as manager:
-        # Put the sproxy execution details into a Queue, from where the
-        # processes from the bucket (see below) will pick them up whenever
-        # there's room for another process to start up.
-        sproxy_execute_queue = manager.Queue()
-        for minion_id in sproxy_minions:
-            device_opts = copy.deepcopy(opts)
-            if roster_targets and isinstance(roster_targets, dict):
-                device_opts["roster_opts"] = roster_targets.get(minion_id, {}).get(
-                    "minion_opts"
+            thread.daemon = True
+            thread.start()
+
+        ret = {}
+        sproxy_minions = list(set(minions) - set(existing_minions))
+        cached_minions = []
+        result_cache_ttl = (__opts__.get("result_cache") or {}).get(salt_function)
+        if result_cache_ttl and use_result_cache:
+            # Serve the results from the cache, without starting a process for
+            # these devices.
+            cached_results = _load_cached_results(
+                sproxy_minions, salt_function, event_args, result_cache_ttl
+            )
+            for minion_id, (minion_ret, age) in six.iteritems(cached_results):
+                log.debug(
+                    "Using the result cached %s seconds ago for %s", age, minion_id
                 )
-            sproxy_execute_queue.put((minion_id, device_opts))
-
-        timeout_devices = manager.list()
-        failed_devices = manager.list()
-        unreachable_devices = manager.list()
-
-        device_count = 0
-        sproxy_processes = []
-        stop_iteration = False
-
-        # In the sequence below, we'll have a process bucket with a maximum size
-        # which is the batch size, which will make room best efforts for
-        # processes to be started up whenever there's a new process finishing
-        # the task (or forcibly stopped due to timeout).
-        while not sproxy_execute_queue.empty() and not stop_iteration:
-            if len(sproxy_processes) >= sproxy_batch_size:
-                # Wait for the bucket to make room for another process.
-                time.sleep(0.001)
-                continue
-            minion_id, device_opts = sproxy_execute_queue.get()
-            log.debug("Starting execution for %s", minion_id)
-            device_proc = multiprocessing.Process(
-                target=_salt_call_and_return,
-                name=minion_id,
-                args=(
+                _process_return(
                     minion_id,
                     salt_function,
+                    minion_ret,
+                    0,
                     ret_queue,
-                    unreachable_devices,
-                    failed_devices,
-                    event_args,
-                    jid,
-                    events,
-                ),
-                kwargs=device_opts,
+                    arg=event_args,
+                    jid=jid,
+                    events=events,
+                    event_queue=event_queue,
+                    changes_only=changes_only,
+                    changes_diff=changes_diff,
+                    cache_age=age,
+                )
+            cached_minions = list(cached_results.keys())
+            sproxy_minions = [
+                minion for minion in sproxy_minions if minion not in cached_results
+            ]
+        if batch_size:
+            if "%" in str(batch_size):
+                percent = int(batch_size.replace("%", ""))
+                batch_size = len(minions) * percent / 100
+            batch_size = int(batch_size)
+            batch_count = int(len(minions) / batch_size) + (
+                1 if len(minions) % batch_size else 0
             )
-            device_proc.start()
-            sproxy_processes.append(device_proc)
-            device_count += 0
-
-            processes = sproxy_processes[:]
-            for proc in processes:
-                if failhard and proc.exitcode:
-                    stop_iteration = True
-
-                if not sproxy_execute_queue.empty() and len(processes) < min(
-                    len(sproxy_minions), sproxy_batch_size
-                ):
-                    # Wait to fill up the sproxy processes bucket, and only then
-                    # start evaluating.
-                    # Why `min()`? It is possible that we can run on a smaller
-                    # set of devices than the batch size.
-                    continue
+            existing_batch_size = int(
+                math.ceil(len(existing_minions) * batch_size / float(len(minions)))
+            )
+            sproxy_batch_size = batch_size - existing_batch_size
+        else:
+            # when no explicit batch requested, we'll execute the command on the
+            # existing minions without any batching (i.e., on all the matched
+            # minions at once), while sproxy ones are executed in as many CPUs are
+            # available.
+            sproxy_batch_size = multiprocessing.cpu_count()
+            existing_batch_size = len(existing_minions)
+            batch_count = int(len(sproxy_minions) / sproxy_batch_size) + (
+                1 if len(sproxy_minions) % sproxy_batch_size else 0
+            )
+        cli_batch = None
+        if existing_batch_size > 0:
+            # When there are existing Minions matching the target, use the native
+            # batching function to execute against these Minions.
+            log.debug("Executing against the existing Minions")
+            log.debug(existing_minions)
+            batch_opts = copy.deepcopy(__opts__)
+            batch_opts["batch"] = str(existing_batch_size)
+            batch_opts["tgt"] = existing_minions
+            batch_opts["tgt_type"] = "list"
+            batch_opts["fun"] = salt_function
+            batch_opts["arg"] = event_args
+            batch_opts["batch_wait"] = batch_wait
+            batch_opts["selected_target_option"] = "list"
+            batch_opts["return"] = returner
+            batch_opts["ret_config"] = returner_config
+            batch_opts["ret_kwargs"] = returner_kwargs
+            if test_ping:
+                cli_batch = PingBatch(batch_opts, quiet=True)
+                (
+                    cli_batch.minions,
+                    cli_batch.ping_gen,
+                    cli_batch.down_minions,
+                ) = cli_batch.gather_minions()
+                cli_batch.gather_minions = cli_batch._gather_minions
+            else:
+                cli_batch = NoPingBatch(batch_opts, quiet=True)
+            log.debug("Batching detected the following Minions responsive")
+            log.debug(cli_batch.minions)
+            if cli_batch.down_minions:
+                log.warning(
+                    "The following existing Minions connected to the Master "
+                    "seem to be unresponsive: %s",
+                    ", ".join(cli_batch.down_minions),
+                )
+                down_minions = cli_batch.down_minions
+                for minion in down_minions:
+                    ret_queue.put(
+                        (
+                            {minion: "Minion did not return. [Not connected]"},
+                            salt.defaults.exitcodes.EX_UNAVAILABLE,
+                        )
+                    )
 
-                # Wait `timeout` seconds for the processes to execute.
-                proc.join(timeout=timeout)
-                if proc.is_alive():
-                    # If the process didn't finish the task, it means it's past
-                    # the timeout value, time to kiss it goodbye.
-                    log.info(
-                        "Terminating the process for %s, as it didn't reply within %d seconds",
-                        proc._name,
-                        timeout,
+        log.info(
+            "%d devices matched the target, executing in %d batches",
+            len(minions),
+            batch_count,
+        )
+        batch_stop_queue = multiprocessing.Queue()
+        sproxy_stop_queue = multiprocessing.Queue()
+        # This dance with the batch_stop_queue and sproxy_stop_queue is necessary
+        # in order to make sure the execution stops at the same time (either at the
+        # very end, or when the iteration must be interrupted - e.g., due to
+        # failhard condition).
+        # sproxy_stop_queue signalises to the batch execution that the sproxy
+        # sequence is over (not under normal circumstances, but interrupted forcibly
+        # therefore it tells to the batch to stop immediately). In a similar way,
+        # batch_stop_queue is required at the very end to make sure we're sending
+        # the sentinel signaling at the very end for the display thread -- for
+        # example there can be situations when the sproxy execution may be empty as
+        # all the targets are existing proxies, so the display must wait.
+        if cli_batch:
+            existing_proxy_thread = threading.Thread(
+                target=_existing_proxy_cli_batch,
+                args=(cli_batch, ret_queue, batch_stop_queue, sproxy_stop_queue),
+            )
+            existing_proxy_thread.daemon = True
+            existing_proxy_thread.start()
+        else:
+            # If there's no batch to execute (i.e., no existing devices to run
+            # against), just need to signalise that there's no need to wait for this
+            # one to complete.
+            batch_stop_queue.put(0)
+
+        log.debug(
+            "Executing sproxy normal run on the following devices (%d batch size):",
+            sproxy_batch_size,
+        )
+        log.debug(sproxy_minions)
+
+        with multiprocessing.Manager() as manager:
+            # Put the sproxy execution details into a Queue, from where the
+            # processes from the bucket (see below) will pick them up whenever
+            # there's room for another process to start up.
+            sproxy_execute_queue = manager.Queue()
+            for minion_id in sproxy_minions:
+                device_opts = copy.deepcopy(opts)
+                if roster_targets and isinstance(roster_targets, dict):
+                    device_opts["roster_opts"] = roster_targets.get(minion_id, {}).get(
+                        "minion_opts"
                     )
-                    sproxy_processes.remove(proc)
-                    if not hide_timeout:
-                        ret_queue.put(
-                            (
-                                {proc._name: "Minion did not return. [No response]"},
-                                salt.defaults.exitcodes.EX_UNAVAILABLE,
-                            )
+                sproxy_execute_queue.put((minion_id, device_opts))
+
+            timeout_devices = manager.list()
+            failed_devices = manager.list()
+            device_timings = manager.list()
+            result_sizes = manager.list()
+            unreachable_devices = manager.list()
+            max_inflight_workers = 0
+
+            device_count = 0
+            sproxy_processes = []
+            stop_iteration = False
+
+            # In the sequence below, we'll have a process bucket with a maximum size
+            # which is the batch size, which will make room best efforts for
+            # processes to be started up whenever there's a new process finishing
+            # the task (or forcibly stopped due to timeout).
+            while not sproxy_execute_queue.empty() and not stop_iteration:
+                if len(sproxy_processes) >= sproxy_batch_size:
+                    # Wait for the bucket to make room for another process.
+                    time.sleep(0.001)
+                    continue
+                minion_id, device_opts = sproxy_execute_queue.get()
+                log.debug("Starting execution for %s", minion_id)
+                device_proc = multiprocessing.Process(
+                    target=_salt_call_and_return,
+                    name=minion_id,
+                    args=(
+                        minion_id,
+                        salt_function,
+                        ret_queue,
+                        unreachable_devices,
+                        failed_devices,
+                        event_args,
+                        jid,
+                        events,
+                        event_queue,
+                        changes_only,
+                        changes_diff,
+                        device_timings,
+                        result_sizes,
+                    ),
+                    kwargs=device_opts,
+                )
+                device_proc.start()
+                sproxy_processes.append(device_proc)
+                max_inflight_workers = max(max_inflight_workers, len(sproxy_processes))
+                device_count += 0
+
+                processes = sproxy_processes[:]
+                for proc in processes:
+                    if failhard and proc.exitcode:
+                        stop_iteration = True
+
+                    if not sproxy_execute_queue.empty() and len(processes) < min(
+                        len(sproxy_minions), sproxy_batch_size
+                    ):
+                        # Wait to fill up the sproxy processes bucket, and only then
+                        # start evaluating.
+                        # Why `min()`? It is possible that we can run on a smaller
+                        # set of devices than the batch size.
+                        continue
+
+                    # Wait `timeout` seconds for the processes to execute.
+                    proc.join(timeout=timeout)
+                    if proc.is_alive():
+                        # If the process didn't finish the task, it means it's past
+                        # the timeout value, time to kiss it goodbye.
+                        log.info(
+                            "Terminating the process for %s, as it didn't reply within %d seconds",
+                            proc._name,
+                            timeout,
                         )
-                    # return code EX_UNAVAILABLE on process timeout?
-                    retcode = max(retcode, salt.defaults.exitcodes.EX_UNAVAILABLE)
-                    timeout_devices.append(proc._name)
-
-                if proc.exitcode and isinstance(proc.exitcode, int):
-                    retcode = max(retcode, proc.exitcode)
-
-                # Terminate the process, making room for a new one.
-                proc.terminate()
-                if proc in sproxy_processes:
-                    # proc may no longer be in sproxy_processes, if it has been
-                    # already removed in the section above when exiting the loop
-                    # forcibly.
-                    sproxy_processes.remove(proc)
-
-            if stop_iteration:
-                log.error("Exiting as an error has occurred")
-                ret_queue.put((_SENTINEL, salt.defaults.exitcodes.EX_GENERIC))
-                sproxy_stop_queue.put(_SENTINEL)
-                for proc in sproxy_processes:
-                    proc.terminate()
-                raise StopIteration
+                        sproxy_processes.remove(proc)
+                        if not hide_timeout:
+                            ret_queue.put(
+                                (
+                                    {
+                                        proc._name: "Minion did not return. [No response]"
+                                    },
+                                    salt.defaults.exitcodes.EX_UNAVAILABLE,
+                                )
+                            )
+                        # return code EX_UNAVAILABLE on process timeout?
+                        retcode = max(retcode, salt.defaults.exitcodes.EX_UNAVAILABLE)
+                        timeout_devices.append(proc._name)
 
-            if len(processes) < min(len(sproxy_minions), sproxy_batch_size):
-                continue
+                    if proc.exitcode and isinstance(proc.exitcode, int):
+                        retcode = max(retcode, proc.exitcode)
 
-            if batch_wait:
-                log.debug(
-                    "Waiting %f seconds before executing the next batch", batch_wait
-                )
-                time.sleep(batch_wait)
+                    # Terminate the process, making room for a new one.
+                    proc.terminate()
+                    if proc in sproxy_processes:
+                        # proc may no longer be in sproxy_processes, if it has been
+                        # already removed in the section above when exiting the loop
+                        # forcibly.
+                        sproxy_processes.remove(proc)
+
+                if stop_iteration:
+                    log.error("Exiting as an error has occurred")
+                    ret_queue.put((_SENTINEL, salt.defaults.exitcodes.EX_GENERIC))
+                    sproxy_stop_queue.put(_SENTINEL)
+                    for proc in sproxy_processes:
+                        proc.terminate()
+                    if events:
+                        event_queue.put(_SENTINEL)
+                        event_thread.join()
+                    raise StopIteration
+
+                if len(processes) < min(len(sproxy_minions), sproxy_batch_size):
+                    continue
 
-        # Waiting for the existing proxy batch to finish.
-        while batch_stop_queue.empty():
-            time.sleep(0.001)
-        batch_retcode = batch_stop_queue.get()
-        retcode = max(retcode, batch_retcode)
+                if batch_wait:
+                    log.debug(
+                        "Waiting %f seconds before executing the next batch", batch_wait
+                    )
+                    time.sleep(batch_wait)
 
-        # Prepare to quit.
-        ret_queue.put((_SENTINEL, 0))
-        # Wait a little to dequeue and print before throwing the progressbar,
-        # the summary, etc.
-        while done_queue.empty():
-            time.sleep(0.001)
+            # Waiting for the existing proxy batch to finish.
+            while batch_stop_queue.empty():
+                time.sleep(0.001)
+            batch_retcode = batch_stop_queue.get()
+            retcode = max(retcode, batch_retcode)
 
-        if progress_bar:
-            progress_bar.finish()
+            # Prepare to quit.
+            ret_queue.put((_SENTINEL, 0))
+            if events:
+                # Publish the remaining return events before the summary.
+                event_queue.put(_SENTINEL)
+                event_thread.join()
+            # Wait a little to dequeue and print before throwing the progressbar,
+            # the summary, etc.
+            while done_queue.empty():
+                time.sleep(0.001)
 
-        if static:
-            resp = {}
-            while True:
-                ret, _retcode = static_queue.get()
-                retcode = max(retcode, _retcode)
-                if ret == _SENTINEL:
-                    break
-                resp.update(ret)
+            if progress_bar:
+                progress_bar.finish()
 
-        if summary:
-            salt.utils.stringutils.print_cli("\n")
-            salt.utils.stringutils.print_cli(
-                "-------------------------------------------"
-            )
-            salt.utils.stringutils.print_cli("Summary")
-            salt.utils.stringutils.print_cli(
-                "-------------------------------------------"
-            )
-            salt.utils.stringutils.print_cli(
-                "# of devices targeted: {0}".format(len(minions))
-            )
-            salt.utils.stringutils.print_cli(
-                "# of devices returned: {0}".format(
-                    len(minions) - len(timeout_devices) - len(unreachable_devices)
+            if static and static_spill:
+                _, _retcode = static_queue.get()
+                retcode = max(retcode, _retcode)
+                _print_spilled_replies(spill_path)
+            elif static:
+                resp = {}
+                while True:
+                    ret, _retcode = static_queue.get()
+                    retcode = max(retcode, _retcode)
+                    if ret == _SENTINEL:
+                        break
+                    resp.update(ret)
+
+            timings_summary = _percentiles(device_timings)
+            if show_timings and timings_summary:
+                with _info_output(stream, stream_file):
+                    _print_timings(timings_summary)
+
+            if __opts__.get("metrics", False):
+                salt_sproxy.metrics.record(
+                    __opts__,
+                    {
+                        "start": job_start,
+                        "end": time.time(),
+                        "devices": {
+                            "returned": len(sproxy_minions)
+                            - len(timeout_devices)
+                            - len(unreachable_devices)
+                            - len(failed_devices),
+                            "timeout": len(timeout_devices),
+                            "unreachable": len(unreachable_devices),
+                            "failed": len(failed_devices),
+                            "cached": len(cached_minions),
+                        },
+                        "timings": list(device_timings),
+                        "result_bytes": sum(result_sizes),
+                        "max_inflight_workers": max_inflight_workers,
+                    },
                 )
-            )
-            salt.utils.stringutils.print_cli(
-                "# of devices that did not return: {0}".format(len(timeout_devices))
-            )
-            salt.utils.stringutils.print_cli(
-                "# of devices with errors: {0}".format(len(failed_devices))
-            )
-            salt.utils.stringutils.print_cli(
-                "# of devices unreachable: {0}".format(len(unreachable_devices))
-            )
-            if verbose:
-                if timeout_devices:
+
+            with _info_output(stream, stream_file):
+                if summary:
+                    salt.utils.stringutils.print_cli("\n")
                     salt.utils.stringutils.print_cli(
-                        (
-                            "\nThe following devices didn't return (timeout):"
-                            "\n - {0}".format("\n - ".join(timeout_devices))
-                        )
+                        "-------------------------------------------"
                     )
-                if failed_devices:
+                    salt.utils.stringutils.print_cli("Summary")
                     salt.utils.stringutils.print_cli(
-                        (
-                            '\nThe following devices returned "bad" output:'
-                            "\n - {0}".format("\n - ".join(failed_devices))
+                        "-------------------------------------------"
+                    )
+                    salt.utils.stringutils.print_cli(
+                        "# of devices targeted: {0}".format(len(minions))
+                    )
+                    salt.utils.stringutils.print_cli(
+                        "# of devices returned: {0}".format(
+                            len(minions)
+                            - len(timeout_devices)
+                            - len(unreachable_devices)
                         )
                     )
-                if unreachable_devices:
                     salt.utils.stringutils.print_cli(
-                        (
-                            "\nThe following devices are unreachable:"
-                            "\n - {0}".format("\n - ".join(unreachable_devices))
+                        "# of devices that did not return: {0}".format(
+                            len(timeout_devices)
                         )
                     )
-            salt.utils.stringutils.print_cli(
-                "-------------------------------------------"
-            )
-            if events:
-                __salt__["event.send"](
-                    "proxy/runner/{jid}/summary".format(jid=jid),
-                    {
-                        "tgt": tgt,
-                        "tgt_type": tgt_type,
-                        "fun": salt_function,
-                        "fun_args": event_args,
-                        "jid": jid,
-                        "user": __pub_user,
-                        "retcode": retcode,
-                        "matched_minions": minions,
-                        "existing_minions": existing_minions,
-                        "sproxy_minions": sproxy_minions,
-                        "timeout_minions": list(timeout_devices),
-                        "down_minions": list(down_minions),
-                        "unreachable_devices": list(unreachable_devices),
-                        "failed_minions": list(failed_devices),
-                    },
-                )
+                    salt.utils.stringutils.print_cli(
+                        "# of devices with errors: {0}".format(len(failed_devices))
+                    )
+                    salt.utils.stringutils.print_cli(
+                        "# of devices unreachable: {0}".format(len(unreachable_devices))
+                    )
+                    if verbose:
+                        if timeout_devices:
+                            salt.utils.stringutils.print_cli(
+                                (
+                                    "\nThe following devices didn't return (timeout):"
+                                    "\n - {0}".format("\n - ".join(timeout_devices))
+                                )
+                            )
+                        if failed_devices:
+                            salt.utils.stringutils.print_cli(
+                                (
+                                    '\nThe following devices returned "bad" output:'
+                                    "\n - {0}".format("\n - ".join(failed_devices))
+                                )
+                            )
+                        if unreachable_devices:
+                            salt.utils.stringutils.print_cli(
+                                (
+                                    "\nThe following devices are unreachable:"
+                                    "\n - {0}".format("\n - ".join(unreachable_devices))
+                                )
+                            )
+                    salt.utils.stringutils.print_cli(
+                        "-------------------------------------------"
+                    )
+                    if events:
+                        summary_data = {
+                            "tgt": tgt,
+                            "tgt_type": tgt_type,
+                            "fun": salt_function,
+                            "fun_args": event_args,
+                            "jid": jid,
+                            "user": __pub_user,
+                            "retcode": retcode,
+                            "matched_minions": minions,
+                            "existing_minions": existing_minions,
+                            "sproxy_minions": sproxy_minions,
+                            "cached_minions": cached_minions,
+                            "timeout_minions": list(timeout_devices),
+                            "down_minions": list(down_minions),
+                            "unreachable_devices": list(unreachable_devices),
+                            "failed_minions": list(failed_devices),
+                            "timings": timings_summary,
+                        }
+                        if __opts__.get("events_slim", False):
+                            # Replace the lists of devices with their length, the
+                            # complete summary being available in the results store.
+                            bank = _results_bank(jid)
+                            salt.cache.factory(__opts__).store(
+                                bank, "__summary__", summary_data
+                            )
+                            summary_data = {
+                                key: len(value)
+                                if key.endswith(("_minions", "_devices"))
+                                else value
+                                for key, value in six.iteritems(summary_data)
+                            }
+                            summary_data["ref"] = "{}/__summary__".format(bank)
+                        __salt__["event.send"](
+                            "proxy/runner/{jid}/summary".format(jid=jid), summary_data
+                        )
+    finally:
+        if spill_path and os.path.exists(spill_path):
+            os.remove(spill_path)
     __context__["retcode"] = retcode
     if retcode != salt.defaults.exitcodes.EX_OK:
-        salt.utils.stringutils.print_cli(
-            "ERROR: Minions returned with non-zero exit code"
-        )
+        with _info_output(stream, stream_file):
+            salt.utils.stringutils.print_cli(
+                "ERROR: Minions returned with non-zero exit code"
+            )
     return resp
 
 
@@ -1310,6 +2172,13 @@ def execute(
     returner="",
     returner_config="",
     returner_kwargs=None,
+    stream=False,
+    stream_file=None,
+    static_spill=False,
+    changes_only=False,
+    changes_diff=False,
+    use_result_cache=True,
+    show_timings=False,
     **kwargs
 ):
     """
@@ -1372,6 +2241,45 @@ def execute(
         Whether to return the results synchronously (or return them as soon
         as the device replies).
 
+    stream: ``False``
+        Write the results as soon as the devices reply, as one compact JSON
+        object per line, with the ``id``, ``retcode``, ``return``, and
+        ``timings`` keys, bypassing the outputter. Takes precedence over
+        ``static``.
+
+    stream_file: ``None``
+        Write the streamed results into this file instead of the standard
+        output.
+
+    static_spill: ``False``
+        When returning the results synchronously (i.e., ``static=True``),
+        collect them into a temporary file on the disk, then print them sorted
+        by the Minion ID, instead of returning them. This keeps the memory
+        usage bounded regardless of the number of devices.
+
+    changes_only: ``False``
+        Only output (and publish the events for) the devices whose return is
+        different from their last successful return of the same function with
+        the same arguments. The fingerprints of the returns are kept in the
+        cache, under the ``_salt_sproxy_changes`` bank.
+
+    changes_diff: ``False``
+        Same as ``changes_only``, but output the structural differences from
+        the previous return, instead of the complete return.
+
+    use_result_cache: ``True``
+        Serve the results from the cache, when available and not expired, for
+        the functions configured under the ``result_cache`` option, without
+        connecting to the devices. The return events of the results served
+        from the cache are marked with the ``cached`` and ``cache_age`` (in
+        seconds) keys, and the devices are listed under ``cached_minions`` in
+        the summary event.
+
+    show_timings: ``False``
+        Display the percentiles of the time spent in each phase of the
+        execution (e.g., Pillar compilation, connection, function execution,
+        etc.) across all the devices.
+
     events: ``True``
         Whether should push events on the Salt bus, similar to when executing
         equivalent through the ``salt`` command.
@@ -1404,7 +2312,11 @@ def execute(
         responsive.
 
     target_cache: ``True``
-        Whether to use the cached target matching results.
+        Whether to use the cached target matching results. The cache stores
+        the devices matched together with their Roster data, for the exact
+        target expression, Roster, Roster file, and Salt environment. When the
+        Roster loads the devices from a file (e.g., ``file`` or ``ansible``),
+        the cache is invalidated as soon as the file is changed.
 
     target_cache_timeout: 60
         The duration to cache the target results for (in seconds).
@@ -1486,14 +2398,18 @@ def execute(
         targets = None
         if target_cache and not (invasive_targeting or preload_targeting):
             cache_bank = salt.cache.factory(__opts__)
-            cache_key = hashlib.sha1(
-                "{tgt}_{tgt_type}".format(tgt=tgt, tgt_type=tgt_type).encode()
-            ).hexdigest()
-            cache_time_key = "{}_time".format(cache_key)
-            cache_time = cache_bank.fetch("_salt_sproxy_target", cache_time_key)
-            if cache_time and time.time() - cache_time <= target_cache_timeout:
+            cache_key = _target_cache_key(tgt, tgt_type, roster, saltenv)
+            roster_fingerprint = _roster_fingerprint(roster)
+            cached = cache_bank.fetch("_salt_sproxy_target", cache_key)
+            if (
+                cached
+                and time.time() - cached.get("time", 0) <= target_cache_timeout
+                and cached.get("fingerprint") == roster_fingerprint
+            ):
                 log.debug("Loading the targets from the cache")
-                targets = cache_bank.fetch("_salt_sproxy_target", cache_key)
+                rtargets = salt_sproxy._roster.loads_compact(cached["targets"])
+                existing_minions = cached.get("existing_minions", [])
+                targets = list(rtargets.keys())
         if not targets:
             rtargets = {}
             if use_existing_proxy:
@@ -1505,17 +2421,52 @@ def execute(
             log.debug("Computing the target using the %s Roster", roster)
             __opts__["use_cached_grains"] = use_cached_grains
             __opts__["use_cached_pillar"] = use_cached_pillar
+            nodegroups_memo = None
+            if (
+                target_cache
+                and not (invasive_targeting or preload_targeting)
+                and tgt_type in ("compound", "nodegroup")
+                and __opts__.get("nodegroups")
+            ):
+                nodegroups_key = _target_cache_key(
+                    "__nodegroups__",
+                    salt_sproxy._roster.nodegroups_fingerprint(__opts__["nodegroups"]),
+                    roster,
+                    saltenv,
+                )
+                nodegroups_memo = _load_nodegroups_memo(
+                    cache_bank, nodegroups_key, roster_fingerprint, target_cache_timeout
+                )
+                # The nodegroups memo is shared with the Roster evaluation,
+                # so the groups already computed resolve without matching
+                # the pool again.
+                __opts__["__sproxy_nodegroups"] = nodegroups_memo
             roster_modules = salt.loader.roster(
                 __opts__, runner=__salt__, whitelist=[roster]
             )
             if ".targets" not in roster:
                 roster = "{mod}.targets".format(mod=roster)
-            rtargets_roster = roster_modules[roster](_tgt, tgt_type=_tgt_type)
+            try:
+                rtargets_roster = roster_modules[roster](_tgt, tgt_type=_tgt_type)
+            finally:
+                __opts__.pop("__sproxy_nodegroups", None)
             rtargets = salt.utils.dictupdate.merge(rtargets, rtargets_roster)
             targets = list(rtargets.keys())
+            if nodegroups_memo:
+                _store_nodegroups_memo(
+                    cache_bank, nodegroups_key, roster_fingerprint, nodegroups_memo
+                )
             if target_cache and not (invasive_targeting or preload_targeting):
-                cache_bank.store("_salt_sproxy_target", cache_key, targets)
-                cache_bank.store("_salt_sproxy_target", cache_time_key, time.time())
+                cache_bank.store(
+                    "_salt_sproxy_target",
+                    cache_key,
+                    {
+                        "time": time.time(),
+                        "fingerprint": roster_fingerprint,
+                        "existing_minions": existing_minions,
+                        "targets": salt_sproxy._roster.dumps_compact(rtargets),
+                    },
+                )
     if preload_targeting or invasive_targeting:
         log.debug(
             "Loaded everything from the Roster, to start collecting Grains and Pillars:"
@@ -1538,10 +2489,11 @@ def execute(
         else:
             jid = salt.utils.jid.gen_jid()  # pylint: disable=no-value-for-parameter
     if verbose or show_jid:
-        salt.utils.stringutils.print_cli("Executing job with jid {0}".format(jid))
-        salt.utils.stringutils.print_cli(
-            "-------------------------------------------\n"
-        )
+        with _info_output(stream, stream_file):
+            salt.utils.stringutils.print_cli("Executing job with jid {0}".format(jid))
+            salt.utils.stringutils.print_cli(
+                "-------------------------------------------\n"
+            )
     if events:
         __salt__["event.send"](jid, {"minions": targets})
     return execute_devices(
@@ -1580,5 +2532,12 @@ def execute(
         returner=returner,
         returner_config=returner_config,
         returner_kwargs=returner_kwargs,
+        stream=stream,
+        stream_file=stream_file,
+        static_spill=static_spill,
+        changes_only=changes_only,
+        changes_diff=changes_diff,
+        use_result_cache=use_result_cache,
+        show_timings=show_timings,
         **kwargs
     )
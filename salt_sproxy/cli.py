@@ -276,9 +276,21 @@ class SaltStandaloneProxy(SaltStandaloneProxyOptionParser):
             roster_path = os.path.join(curpath, "_roster")
             roster_dirs.append(roster_path)
             self.config["roster_dirs"] = roster_dirs
+            roster_whitelist = [self.config["roster"]]
+            if self.config["roster"] == "multi":
+                # The multi Roster loads other Rosters, which need to be synced
+                # as well.
+                for roster in self.config.get("roster_multi", {}).get("rosters", []):
+                    if isinstance(roster, dict):
+                        roster_whitelist.extend(roster.keys())
+                    else:
+                        roster_whitelist.append(roster)
             sync_roster_ret = runner_client.cmd(
                 "saltutil.sync_roster",
-                kwarg={"saltenv": saltenv, "extmod_whitelist": self.config["roster"]},
+                kwarg={
+                    "saltenv": saltenv,
+                    "extmod_whitelist": ",".join(roster_whitelist),
+                },
                 print_event=False,
             )
             log.debug(sync_roster_ret)
@@ -359,6 +371,11 @@ class SaltStandaloneProxy(SaltStandaloneProxyOptionParser):
             "verbose",
             "show_jid",
             "hide_timeout",
+            "stream",
+            "stream_file",
+            "changes_only",
+            "changes_diff",
+            "show_timings",
             "progress",
             "returner",
             "target_cache",
@@ -376,6 +393,7 @@ class SaltStandaloneProxy(SaltStandaloneProxyOptionParser):
             "no_pillar": "with_pillar",
             "dont_cache_grains": "cache_grains",
             "dont_cache_pillar": "cache_pillar",
+            "no_result_cache": "use_result_cache",
         }
         for opt, kwarg in six.iteritems(reverse_opts):
             if getattr(self.options, opt):
@@ -398,6 +416,7 @@ class SaltStandaloneProxy(SaltStandaloneProxyOptionParser):
         kwargs["preload_targeting"] = self.config.get("preload_targeting", False)
         kwargs["invasive_targeting"] = self.config.get("invasive_targeting", False)
         kwargs["failhard"] = self.config.get("failhard", False)
+        kwargs["static_spill"] = self.config.get("static_spill", False)
         self.config["arg"] = [tgt, fun, kwargs]
         runner = salt.runner.Runner(self.config)
 
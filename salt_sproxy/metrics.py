@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Operational metrics for the salt-sproxy jobs, exposed in the Prometheus text
+format.
+
+At the end of every job, the Proxy Runner records the metrics of the job into
+the Salt cache (under the ``_salt_sproxy_metrics`` bank), accumulated over
+all the jobs executed. The metrics can then be written into a file to be
+collected by the Prometheus node exporter (textfile collector), or served
+over HTTP by salt-sapi.
+"""
+from __future__ import absolute_import
+
+import os
+import logging
+import tempfile
+import threading
+
+import six
+import salt.cache
+
+from six.moves import BaseHTTPServer
+
+log = logging.getLogger(__name__)
+
+CACHE_BANK = "_salt_sproxy_metrics"
+CACHE_KEY = "metrics"
+
+PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+DEVICE_STATUSES = ("returned", "timeout", "unreachable", "failed", "cached")
+LAST_JOB_HELP = {
+    "timestamp_seconds": "When the last job ended, as a UNIX timestamp.",
+    "duration_seconds": "Duration of the last job.",
+    "devices": "Number of devices executed on in the last job.",
+    "devices_per_second": "Throughput of the last job.",
+    "max_inflight_workers": "Maximum number of device processes running "
+    "concurrently during the last job.",
+}
+
+_LOCK = threading.Lock()
+
+
+def _empty_state():
+    return {
+        "jobs": 0,
+        "devices": {status: 0 for status in DEVICE_STATUSES},
+        "result_bytes": 0,
+        "phases": {},
+        "last_job": {},
+    }
+
+
+def load(opts):
+    """
+    Load the metrics accumulated so far from the cache.
+    """
+    state = salt.cache.factory(opts).fetch(CACHE_BANK, CACHE_KEY)
+    return state or _empty_state()
+
+
+def record(opts, job):
+    """
+    Accumulate the metrics of a job into the cache, and write them into the
+    ``metrics_textfile`` file, when configured. The ``job`` dictionary has
+    the following keys:
+
+    - ``start``, ``end``: the start and end timestamps of the job.
+    - ``devices``: the number of devices per status, see ``DEVICE_STATUSES``.
+    - ``timings``: the list of the timings of each device (see
+      ``proxy.salt_call``).
+    - ``result_bytes``: the total size of the results returned.
+    - ``max_inflight_workers``: the maximum number of device processes running
+      at the same time.
+
+    Note that the metrics are accumulated as read-modify-write on the cache,
+    so the counts from the jobs ending at the exact same time may be lost.
+    """
+    with _LOCK:
+        state = load(opts)
+        state["jobs"] += 1
+        for status in DEVICE_STATUSES:
+            state["devices"][status] = state["devices"].get(status, 0) + job.get(
+                "devices", {}
+            ).get(status, 0)
+        state["result_bytes"] += job.get("result_bytes", 0)
+        for timings in job.get("timings", []):
+            for phase, duration in six.iteritems(timings):
+                hist = state["phases"].setdefault(
+                    phase, {"buckets": [0] * len(PHASE_BUCKETS), "sum": 0, "count": 0}
+                )
+                for index, bound in enumerate(PHASE_BUCKETS):
+                    if duration <= bound:
+                        hist["buckets"][index] += 1
+                hist["sum"] += duration
+                hist["count"] += 1
+        duration = max(job["end"] - job["start"], 0.000001)
+        devices = sum(job.get("devices", {}).values())
+        state["last_job"] = {
+            "timestamp_seconds": job["end"],
+            "duration_seconds": duration,
+            "devices": devices,
+            "devices_per_second": devices / duration,
+            "max_inflight_workers": job.get("max_inflight_workers", 0),
+        }
+        salt.cache.factory(opts).store(CACHE_BANK, CACHE_KEY, state)
+    if opts.get("metrics_textfile"):
+        write_textfile(opts["metrics_textfile"], render(state))
+    return state
+
+
+def _metric(lines, name, mtype, helpstr, samples):
+    lines.append("# HELP {} {}".format(name, helpstr))
+    lines.append("# TYPE {} {}".format(name, mtype))
+    for labels, value in samples:
+        if labels:
+            labels = "{{{}}}".format(
+                ",".join('{}="{}"'.format(key, val) for key, val in labels)
+            )
+        lines.append("{}{} {}".format(name, labels or "", value))
+
+
+def render(state):
+    """
+    Render the metrics in the Prometheus text format.
+    """
+    lines = []
+    _metric(
+        lines,
+        "sproxy_jobs_total",
+        "counter",
+        "Number of salt-sproxy jobs executed.",
+        [(None, state["jobs"])],
+    )
+    _metric(
+        lines,
+        "sproxy_devices_total",
+        "counter",
+        "Number of devices executed on, per status.",
+        [
+            ((("status", status),), state["devices"].get(status, 0))
+            for status in DEVICE_STATUSES
+        ],
+    )
+    _metric(
+        lines,
+        "sproxy_result_bytes_total",
+        "counter",
+        "Total size of the results returned by the devices, in bytes.",
+        [(None, state["result_bytes"])],
+    )
+    samples = []
+    for phase in sorted(state["phases"]):
+        hist = state["phases"][phase]
+        for bound, count in zip(PHASE_BUCKETS, hist["buckets"]):
+            samples.append(((("phase", phase), ("le", bound)), count))
+        samples.append(((("phase", phase), ("le", "+Inf")), hist["count"]))
+    _metric(
+        lines,
+        "sproxy_phase_duration_seconds",
+        "histogram",
+        "Time spent in each phase of the execution on a device.",
+        [],
+    )
+    for labels, value in samples:
+        lines.append(
+            "sproxy_phase_duration_seconds_bucket{{{}}} {}".format(
+                ",".join('{}="{}"'.format(key, val) for key, val in labels), value
+            )
+        )
+    for phase in sorted(state["phases"]):
+        hist = state["phases"][phase]
+        lines.append(
+            'sproxy_phase_duration_seconds_sum{{phase="{}"}} {}'.format(
+                phase, hist["sum"]
+            )
+        )
+        lines.append(
+            'sproxy_phase_duration_seconds_count{{phase="{}"}} {}'.format(
+                phase, hist["count"]
+            )
+        )
+    for name, value in sorted(six.iteritems(state["last_job"])):
+        _metric(
+            lines,
+            "sproxy_last_job_{}".format(name),
+            "gauge",
+            LAST_JOB_HELP.get(name, ""),
+            [(None, value)],
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path, text):
+    """
+    Write the metrics into a file, atomically, so the Prometheus node exporter
+    never collects a partially written file.
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    fd_, tmp_path = tempfile.mkstemp(dir=dirname, prefix=".sproxy-metrics")
+    try:
+        with os.fdopen(fd_, "w") as fp_:
+            fp_.write(text)
+        os.chmod(tmp_path, 0o644)
+        os.rename(tmp_path, path)
+    except OSError:
+        log.error("Unable to write the metrics into %s", path, exc_info=True)
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def serve(opts, port, address="127.0.0.1"):
+    """
+    Serve the metrics over HTTP, under the ``/metrics`` path, from a
+    background thread. Only listening on the loopback interface by default,
+    any other address needs to be requested explicitly. Returns the HTTP
+    server object.
+    """
+
+    class MetricsHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+        def do_GET(self):  # pylint: disable=invalid-name
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render(load(opts)).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+            log.debug("Metrics request: " + format, *args)
+
+    server = BaseHTTPServer.HTTPServer((address, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    log.info("Serving the salt-sproxy metrics on %s:%d", address, port)
+    return server
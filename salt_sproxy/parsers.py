@@ -506,12 +506,68 @@ class SaltStandaloneProxyOptionParser(
             action="store_true",
             help="Display jid without the additional output of --verbose.",
         )
+        self.add_option(
+            "--timings",
+            dest="show_timings",
+            default=False,
+            action="store_true",
+            help=(
+                "Display the percentiles of the time spent in each phase of "
+                "the execution, across all the devices."
+            ),
+        )
         self.add_option(
             "--hide-timeout",
             default=False,
             action="store_true",
             help="Hide devices that timeout.",
         )
+        self.add_option(
+            "--no-result-cache",
+            dest="no_result_cache",
+            default=False,
+            action="store_true",
+            help=(
+                "Do not serve the results from the cache, for the functions "
+                "configured under the result_cache option."
+            ),
+        )
+        self.add_option(
+            "--changes-only",
+            dest="changes_only",
+            default=False,
+            action="store_true",
+            help=(
+                "Only display the devices whose return has changed since the "
+                "last run of the same command."
+            ),
+        )
+        self.add_option(
+            "--changes-diff",
+            dest="changes_diff",
+            default=False,
+            action="store_true",
+            help=(
+                "Same as --changes-only, but display the differences from the "
+                "previous return."
+            ),
+        )
+        self.add_option(
+            "--stream",
+            default=False,
+            action="store_true",
+            help=(
+                "Write the results as soon as the devices reply, as one JSON "
+                "object per line, bypassing the outputter."
+            ),
+        )
+        self.add_option(
+            "--stream-file",
+            dest="stream_file",
+            default=None,
+            metavar="FILE",
+            help="Write the streamed results into this file, instead of stdout.",
+        )
         self.add_option(
             "--batch-wait",
             default=0,
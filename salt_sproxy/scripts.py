@@ -7,10 +7,12 @@ import logging
 
 import six
 import salt.netapi
+import salt.cli.api
 import salt.scripts
 import salt.utils.parsers
 from salt.scripts import _install_signal_handlers
 from salt_sproxy._runners.proxy import execute as sproxy_execute
+import salt_sproxy.metrics
 
 log = logging.getLogger(__name__)
 
@@ -81,6 +83,25 @@ salt.utils.parsers.SaltAPIParser.epilog = (
     "https://docs.saltstack.com/en/latest/ref/cli/salt-api.html."
 )
 
+_sapi_prepare = salt.cli.api.SaltAPI.prepare
+
+
+def sapi_prepare(self):
+    """
+    Prepare the salt-sapi daemon, then start serving the salt-sproxy metrics
+    when the ``metrics_port`` option is configured.
+    """
+    _sapi_prepare(self)
+    if self.config.get("metrics_port"):
+        salt_sproxy.metrics.serve(
+            self.config,
+            self.config["metrics_port"],
+            address=self.config.get("metrics_address", "127.0.0.1"),
+        )
+
+
+salt.cli.api.SaltAPI.prepare = sapi_prepare
+
 
 def salt_sapi():
     """
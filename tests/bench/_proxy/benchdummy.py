@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Dummy Proxy Module simulating the behaviour of real network devices, for
+benchmarking purposes: each device takes a configurable amount of time to
+connect and to execute, and a fraction of them can fail or hang.
+
+The behaviour is configured in the ``proxy`` Pillar (or the Master
+configuration):
+
+.. code-block:: yaml
+
+    proxy:
+      proxytype: benchdummy
+      connect_latency: 0.5
+      exec_latency: 0.2
+      jitter: 0.1
+      fail_rate: 0.01
+      unreachable_rate: 0.01
+      hang_rate: 0.001
+      hang_time: 3600
+
+The latencies and the jitter are expressed in seconds, the rates as a
+fraction between 0 and 1. ``test.ping`` executes through the ``ping``
+function of this module, so it incurs the ``exec_latency``.
+"""
+from __future__ import absolute_import
+
+import time
+import random
+import logging
+
+__proxyenabled__ = ["benchdummy"]
+
+log = logging.getLogger(__name__)
+
+DETAILS = {}
+
+
+def __virtual__():
+    return True
+
+
+def _sleep(latency):
+    jitter = DETAILS.get("jitter", 0)
+    time.sleep(max(latency + random.uniform(-jitter, jitter), 0))
+
+
+def _maybe_hang():
+    if random.random() < DETAILS.get("hang_rate", 0):
+        log.debug("Simulating a hung device")
+        time.sleep(DETAILS.get("hang_time", 3600))
+
+
+def init(opts):
+    DETAILS.update(opts.get("proxy", {}))
+    _sleep(DETAILS.get("connect_latency", 0))
+    if random.random() < DETAILS.get("unreachable_rate", 0):
+        raise Exception("Simulated connection failure")
+    _maybe_hang()
+    DETAILS["initialized"] = True
+
+
+def initialized():
+    return DETAILS.get("initialized", False)
+
+
+def alive(opts):
+    return DETAILS.get("initialized", False)
+
+
+def grains():
+    return {"vendor": "benchdummy", "os": "benchdummy"}
+
+
+def grains_refresh():
+    return grains()
+
+
+def ping():
+    _sleep(DETAILS.get("exec_latency", 0))
+    _maybe_hang()
+    if random.random() < DETAILS.get("fail_rate", 0):
+        raise Exception("Simulated execution failure")
+    return True
+
+
+def shutdown(opts):
+    DETAILS["initialized"] = False
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Measure the throughput of the salt-sproxy execution against simulated
+devices, without any real device.
+
+Every device is managed through the ``benchdummy`` Proxy Module (see
+``_proxy/benchdummy.py``), which simulates the connection and execution
+latencies, as well as the devices failing, unreachable, or hanging. The pool
+of devices is generated by ``roster.py``.
+
+For each pool size and execution mode, the Proxy Runner is executed in a
+separate process, reporting the wall time, the number of devices per
+second, the peak RSS and the CPU time (including the device processes).
+
+Usage:
+
+.. code-block:: bash
+
+    $ python tests/bench/execute.py --devices 1000 10000 --batch-size 100 \\
+        --connect-latency 0.5 --exec-latency 0.2 --jitter 0.1 \\
+        --modes default static stream
+"""
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import json
+import time
+import shutil
+import resource
+import argparse
+import tempfile
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.dirname(os.path.dirname(BENCH_DIR)))
+
+MODES = {
+    "default": {},
+    "static": {"static": True, "static_spill": False},
+    "static_spill": {"static": True, "static_spill": True},
+    "stream": {"stream": True, "stream_file": os.devnull},
+}
+
+
+def _rusage():
+    self_ = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # ru_maxrss is in kilobytes on Linux, and in bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "peak_rss_mb": round(self_.ru_maxrss * scale / 1048576.0, 1),
+        "peak_child_rss_mb": round(children.ru_maxrss * scale / 1048576.0, 1),
+        "cpu_seconds": round(
+            self_.ru_utime + self_.ru_stime + children.ru_utime + children.ru_stime,
+            2,
+        ),
+    }
+
+
+def run(args):
+    """
+    Execute the Runner once, in the current process, and return the
+    measurements.
+    """
+    import salt.config
+    import salt.loader
+    import roster
+    import salt_sproxy._runners.proxy as proxy_runner
+
+    cachedir = tempfile.mkdtemp(prefix="sproxy-bench-")
+    opts = salt.config.master_config(os.devnull)
+    opts.update(
+        {
+            "cachedir": cachedir,
+            "pki_dir": os.path.join(cachedir, "pki"),
+            "sock_dir": os.path.join(cachedir, "sock"),
+            "file_client": "local",
+            "pillar_roots": {"base": []},
+            "proxy_dirs": [os.path.join(BENCH_DIR, "_proxy")],
+        }
+    )
+    proxy_runner.__opts__ = opts
+    proxy_runner.__salt__ = salt.loader.runner(opts)
+    proxy_runner.__utils__ = {"user.get_specific_user": lambda: "bench"}
+    proxy_runner.__context__ = {}
+
+    pool = roster.generate(args.count, seed=args.seed)
+    roster_targets = {
+        device: {"minion_opts": {"grains": device_opts["grains"]}}
+        for device, device_opts in pool.items()
+    }
+    proxy = {
+        "proxytype": "benchdummy",
+        "connect_latency": args.connect_latency,
+        "exec_latency": args.exec_latency,
+        "jitter": args.jitter,
+        "fail_rate": args.fail_rate,
+        "unreachable_rate": args.unreachable_rate,
+        "hang_rate": args.hang_rate,
+        "hang_time": args.timeout * 2,
+    }
+    kwargs = dict(MODES[args.mode])
+    # The output is discarded, but still rendered, as it is part of the cost
+    # of the execution.
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    stdout = os.dup(1)
+    os.dup2(devnull, 1)
+    start = time.time()
+    try:
+        proxy_runner.execute_devices(
+            list(pool),
+            args.function,
+            with_pillar=False,
+            preload_pillar=False,
+            default_pillar={"proxy": proxy},
+            cache_grains=False,
+            cache_pillar=False,
+            roster_targets=roster_targets,
+            batch_size=args.batch_size,
+            timeout=args.timeout,
+            events=False,
+            **kwargs
+        )
+    finally:
+        sys.stdout.flush()
+        os.dup2(stdout, 1)
+        shutil.rmtree(cachedir, ignore_errors=True)
+    wall = time.time() - start
+    ret = {
+        "mode": args.mode,
+        "devices": args.count,
+        "wall_seconds": round(wall, 2),
+        "devices_per_second": round(args.count / wall, 2),
+    }
+    ret.update(_rusage())
+    return ret
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--devices",
+        type=int,
+        nargs="+",
+        default=[1000],
+        help="The pool sizes to benchmark. Default: 1000.",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        choices=sorted(MODES),
+        default=sorted(MODES),
+        help="The execution modes to benchmark. Default: all.",
+    )
+    parser.add_argument("--function", default="test.ping")
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--timeout", type=int, default=60)
+    parser.add_argument("--connect-latency", type=float, default=0.0)
+    parser.add_argument("--exec-latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--unreachable-rate", type=float, default=0.0)
+    parser.add_argument("--hang-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--json", help="Write the results into this file, in JSON format."
+    )
+    parser.add_argument("--count", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        # Executing a single run, from the parent process below.
+        print(json.dumps(run(args)))
+        return
+
+    results = []
+    header = "{:>8} {:>13} {:>10} {:>12} {:>10} {:>14} {:>8}".format(
+        "devices",
+        "mode",
+        "wall (s)",
+        "devices/s",
+        "RSS (MB)",
+        "child RSS (MB)",
+        "CPU (s)",
+    )
+    print(header)
+    print("-" * len(header))
+    for count in args.devices:
+        for mode in args.modes:
+            cmd = [sys.executable, os.path.abspath(__file__)] + sys.argv[1:]
+            cmd += ["--count", str(count), "--mode", mode]
+            # The errors logged by the simulated failures are discarded,
+            # unless the run itself fails.
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            out, err = proc.communicate()
+            if proc.returncode:
+                sys.stderr.write(err.decode())
+                sys.exit(proc.returncode)
+            result = json.loads(out.decode().strip().splitlines()[-1])
+            results.append(result)
+            print(
+                "{devices:>8} {mode:>13} {wall_seconds:>10} {devices_per_second:>12} "
+                "{peak_rss_mb:>10} {peak_child_rss_mb:>14} {cpu_seconds:>8}".format(
+                    **result
+                )
+            )
+    if args.json:
+        with open(args.json, "w") as fp_:
+            json.dump(results, fp_, indent=2)
+
+
+if __name__ == "__main__":
+    main()
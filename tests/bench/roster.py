@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Generate synthetic Roster pools for benchmarking, with Grains and Pillar
+shaped like the ones of a real network: a few vendors and platforms, sites,
+roles, and device names following a naming convention.
+
+Usage:
+
+.. code-block:: bash
+
+    $ python tests/bench/roster.py 10000 > /tmp/roster
+"""
+from __future__ import absolute_import, print_function
+
+import sys
+import random
+import argparse
+
+import salt.utils.yaml
+
+ROLES = (
+    ("edge", "router"),
+    ("core", "router"),
+    ("spine", "switch"),
+    ("leaf", "switch"),
+    ("tor", "switch"),
+    ("fw", "firewall"),
+)
+PLATFORMS = (
+    ("junos", "juniper", "MX480"),
+    ("junos", "juniper", "QFX5100"),
+    ("eos", "arista", "DCS-7280SR"),
+    ("iosxr", "cisco", "ASR9K"),
+    ("nxos", "cisco", "N9K-C93180YC"),
+    ("panos", "paloalto", "PA-5250"),
+)
+
+
+def generate(count, sites=None, seed=0):
+    """
+    Return a pool of ``count`` devices, as a dictionary in the format
+    returned by the Roster modules, i.e., ``{<device ID>: <device opts>}``.
+    """
+    rand = random.Random(seed)
+    sites = sites or max(count // 500, 1)
+    pool = {}
+    for index in range(count):
+        site = "site{:04d}".format(rand.randrange(sites))
+        role, device_type = ROLES[rand.randrange(len(ROLES))]
+        driver, vendor, model = PLATFORMS[rand.randrange(len(PLATFORMS))]
+        name = "{}{}.{}".format(role, index, site)
+        pool[name] = {
+            "driver": driver,
+            "grains": {
+                "role": role,
+                "device_type": device_type,
+                "site": site,
+                "region": "region{}".format(int(site[4:]) % 8),
+                "vendor": vendor,
+                "model": model,
+                "os": driver,
+                "tags": rand.sample(["prod", "lab", "pci", "ipv6", "mpls"], 2),
+            },
+            "pillar": {
+                "proxy": {
+                    "driver": driver,
+                    "host": "10.{}.{}.{}".format(
+                        (index >> 16) & 255, (index >> 8) & 255, index & 255
+                    ),
+                },
+                "ntp_servers": ["10.0.0.1", "10.0.0.2"],
+                "snmp": {"community": "public", "location": site},
+                "bgp": {"asn": 64512 + rand.randrange(1000)},
+            },
+        }
+    return pool
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("count", type=int, help="The number of devices.")
+    parser.add_argument("--sites", type=int, help="The number of sites.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    salt.utils.yaml.safe_dump(
+        generate(args.count, sites=args.sites, seed=args.seed),
+        sys.stdout,
+        default_flow_style=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmarks for the targeting engines from ``salt_sproxy._roster``.
+
+Every targeting engine (see ``TGT_FUN``), the compound expressions of
+increasing complexity, and ``load_cache`` are timed against synthetic pools
+of devices (see ``roster.py``), for each of the pool sizes requested. The
+compound expressions are also evaluated using the ``eval`` based matcher
+salt-sproxy used before the compiled targets (see ``legacy_compound``), as
+the ``*_legacy`` cases, for reference.
+
+The results can be saved into a JSON baseline, then compared against, e.g.,
+before and after a change:
+
+.. code-block:: bash
+
+    $ python tests/bench/targeting.py --sizes 1000 10000 --save /tmp/base.json
+    $ # ... apply the change ...
+    $ python tests/bench/targeting.py --sizes 1000 10000 --compare /tmp/base.json
+"""
+from __future__ import absolute_import, print_function
+
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(1, os.path.dirname(os.path.dirname(BENCH_DIR)))
+
+import six  # noqa: E402
+import salt.cache  # noqa: E402
+import salt.utils.minions  # noqa: E402
+
+import roster  # noqa: E402
+import salt_sproxy._roster  # noqa: E402
+from salt_sproxy.version import __version__  # noqa: E402
+
+NODEGROUPS = {
+    "routers": "G@device_type:router",
+    "juniper_routers": "N@routers and G@vendor:juniper",
+    "dc_fabric": ["G@role:spine", "or", "G@role:leaf", "or", "G@role:tor"],
+}
+
+# (<name>, <target type>, <target expression>); ``{0}``, ``{1}``, and ``{2}``
+# are replaced by the IDs of devices from the pool.
+CASES = (
+    ("glob_literal", "glob", "{0}"),
+    ("glob_prefix", "glob", "edge*"),
+    ("glob_wildcard", "glob", "*.site000?"),
+    ("pcre", "pcre", r"^(edge|core)\d+\.site00[0-4]\d$"),
+    ("list", "list", ["{0}", "{1}", "{2}", "missing"]),
+    ("grain", "grain", "vendor:juniper"),
+    ("grain_nested_list", "grain", "tags:pci"),
+    ("grain_pcre", "grain_pcre", "model:(MX|QFX).*"),
+    ("pillar", "pillar", "snmp:location:site0000"),
+    ("pillar_pcre", "pillar_pcre", "proxy:host:10\\.0\\.0\\..*"),
+    ("nodegroup", "nodegroup", "juniper_routers"),
+    ("compound_simple", "compound", "G@role:edge and edge*"),
+    (
+        "compound_medium",
+        "compound",
+        "G@vendor:cisco and ( G@role:core or G@role:edge ) and not I@bgp:asn:64512",
+    ),
+    (
+        "compound_complex",
+        "compound",
+        "( N@dc_fabric and G@tags:ipv6 and not G@site:site0000 ) or "
+        "( E@^core\\d+ and P@model:ASR.* ) or ( N@juniper_routers and "
+        "J@proxy:host:10\\.0\\.0\\..* ) or L@{0},{1},{2}",
+    ),
+)
+
+
+def _pool(size, seed=0):
+    """
+    Return a synthetic pool in the format expected by the targeting engines,
+    i.e., with the Grains and Pillar under ``minion_opts``.
+    """
+    return {
+        device: {
+            "minion_opts": {
+                "grains": device_opts["grains"],
+                "pillar": device_opts["pillar"],
+            }
+        }
+        for device, device_opts in roster.generate(size, seed=seed).items()
+    }
+
+
+def _cases(pool):
+    """
+    Return the benchmark cases, targeting devices that exist in the pool.
+    """
+    devices = list(pool)[:3]
+
+    def _format(tgt):
+        if isinstance(tgt, list):
+            return [_format(word) for word in tgt]
+        return tgt.format(*devices)
+
+    return [(name, tgt_type, _format(tgt)) for name, tgt_type, tgt in CASES]
+
+
+def legacy_compound(pool, tgt, opts=None):
+    """
+    The compound matcher from salt-sproxy 2023.8.0: every term is matched
+    against the entire pool, then the sets are rendered into a Python
+    expression, evaluated using ``eval``. The nodegroups are expanded
+    recursively, every time they're referenced.
+    """
+    if isinstance(tgt, six.string_types):
+        words = tgt.split()
+    else:
+        words = tgt[:]
+    results = []
+    while words:
+        word = words.pop(0)
+        target_info = salt.utils.minions.parse_target(word)
+        if word in ("and", "or", "not", "(", ")"):
+            if word == "not" and results and results[-1] not in ("and", "or", "("):
+                results.append("and")
+            results.append(word)
+        elif target_info and target_info["engine"]:
+            if target_info["engine"] == "N":
+                nodegroups = (opts or {}).get("nodegroups", {})
+                res = legacy_compound(
+                    pool, nodegroups.get(target_info["pattern"], ""), opts=opts
+                )
+            else:
+                engine = salt_sproxy._roster.TGT_FUN[target_info["engine"]]
+                res = engine(pool, target_info["pattern"], opts=opts)
+            results.append(str(set(res.keys())))
+        else:
+            res = salt_sproxy._roster.glob(pool, word, opts=opts)
+            results.append(str(set(res.keys())))
+    expr_chunks = []
+    parens_count = 0
+    universe = set(pool.keys())
+    for index, res in enumerate(results):
+        if res == "not":
+            res = "{} -".format(universe)
+        if res == "and":
+            if results[index + 1] == "not":
+                res = "-"
+                results[index + 1] = ""
+            else:
+                res = "&"
+        elif res == "or":
+            if results[index + 1] == "not":
+                res = "| ( {} -".format(universe)
+                parens_count += 1
+                results[index + 1] = ""
+            else:
+                res = "|"
+        expr_chunks.append(res)
+    expr_chunks += ")" * parens_count
+    matched_minions = eval(" ".join(expr_chunks))  # pylint: disable=W0123
+    return {minion: pool[minion] for minion in matched_minions}
+
+
+def _time(fun, repeat, setup=None):
+    """
+    Execute ``fun`` ``repeat`` times, and return the time of the first
+    execution, and the best one.
+    """
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        fun(*args)
+        timings.append(time.perf_counter() - start)
+    return {"first": timings[0], "best": min(timings)}
+
+
+def _bench_engines(pool, opts, repeat):
+    ret = {}
+    cases = _cases(pool)
+    for name, tgt_type, tgt in cases:
+        fun = salt_sproxy._roster.TGT_FUN[tgt_type]
+        ret[name] = _time(lambda: fun(pool, tgt, opts=opts), repeat)
+        ret[name]["matched"] = len(fun(pool, tgt, opts=opts))
+    # The compound expressions evaluated with the integer bitsets, regardless
+    # of the pool size, and with the legacy matcher.
+    bitset_opts = dict(opts, target_bitset_threshold=0)
+    for name, tgt_type, tgt in cases:
+        if tgt_type != "compound":
+            continue
+        ret[name + "_bitset"] = _time(
+            lambda: salt_sproxy._roster.compound(pool, tgt, opts=bitset_opts), repeat
+        )
+        ret[name + "_legacy"] = _time(
+            lambda: legacy_compound(pool, tgt, opts=opts), repeat
+        )
+        ret[name + "_legacy"]["matched"] = len(legacy_compound(pool, tgt, opts=opts))
+    return ret
+
+
+def _bench_load_cache(pool, repeat):
+    """
+    Time loading the Grains and Pillar for the entire pool from the cache,
+    using the ``localfs`` cache.
+    """
+    cachedir = tempfile.mkdtemp(prefix="sproxy-bench-")
+    opts = {"cache": "localfs", "cachedir": cachedir}
+    try:
+        cache = salt.cache.factory(opts)
+        for device, device_opts in pool.items():
+            for key in ("grains", "pillar"):
+                cache.store(
+                    "minions/{}/data".format(device),
+                    key,
+                    device_opts["minion_opts"][key],
+                )
+        roster_pool = {device: {} for device in pool}
+        return {
+            "load_cache": _time(
+                lambda pool_: salt_sproxy._roster.load_cache(
+                    pool_, None, opts, "*", tgt_type="compound"
+                ),
+                repeat,
+                setup=lambda: (copy.deepcopy(roster_pool),),
+            )
+        }
+    finally:
+        shutil.rmtree(cachedir, ignore_errors=True)
+
+
+def _compare(results, baseline, threshold):
+    """
+    Print the ratio between the results and the baseline, and return the
+    cases slower than the baseline by more than ``threshold``.
+    """
+    regressions = []
+    for size, cases in sorted(results.items(), key=lambda item: int(item[0])):
+        for name, timing in cases.items():
+            base = baseline.get(size, {}).get(name)
+            if not base:
+                continue
+            ratio = timing["best"] / max(base["best"], 1e-9)
+            flag = ""
+            if ratio > 1 + threshold:
+                flag = "  << slower"
+                regressions.append((size, name, ratio))
+            print(
+                "{:>8} {:<26} {:>12.6f} {:>12.6f} {:>7.2f}x{}".format(
+                    size, name, base["best"], timing["best"], ratio, flag
+                )
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--sizes",
+        type=int,
+        nargs="+",
+        default=[1000, 10000, 50000],
+        help="The pool sizes to benchmark. Default: 1000 10000 50000.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="How many times to execute each case. Default: 5.",
+    )
+    parser.add_argument(
+        "--plan-cache",
+        action="store_true",
+        help="Reuse the compiled targets between the executions, as a "
+        "long-running process (e.g., salt-sapi) would.",
+    )
+    parser.add_argument(
+        "--no-load-cache",
+        action="store_true",
+        help="Don't benchmark loading the Grains and Pillar from the cache.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", help="Save the results into this JSON file.")
+    parser.add_argument(
+        "--compare", help="Compare the results against this JSON baseline."
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="With --compare, the relative slowdown reported as a regression. "
+        "Default: 0.2 (20%%).",
+    )
+    args = parser.parse_args()
+
+    opts = {
+        "nodegroups": NODEGROUPS,
+        "target_plan_cache_size": 256 if args.plan_cache else 0,
+    }
+    results = {}
+    for size in args.sizes:
+        pool = _pool(size, seed=args.seed)
+        results[str(size)] = _bench_engines(pool, opts, args.repeat)
+        if not args.no_load_cache:
+            results[str(size)].update(_bench_load_cache(pool, min(args.repeat, 3)))
+        if not args.compare:
+            for name, timing in results[str(size)].items():
+                print(
+                    "{:>8} {:<26} first: {:>10.6f}s  best: {:>10.6f}s{}".format(
+                        size,
+                        name,
+                        timing["first"],
+                        timing["best"],
+                        "  ({} matched)".format(timing["matched"])
+                        if "matched" in timing
+                        else "",
+                    )
+                )
+
+    if args.save:
+        with open(args.save, "w") as fp_:
+            json.dump(
+                {
+                    "version": __version__,
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "repeat": args.repeat,
+                    "plan_cache": args.plan_cache,
+                    "results": results,
+                },
+                fp_,
+                indent=2,
+                sort_keys=True,
+            )
+
+    if args.compare:
+        with open(args.compare) as fp_:
+            baseline = json.load(fp_)
+        print(
+            "Comparing against {} (Python {})".format(
+                baseline.get("version"), baseline.get("python")
+            )
+        )
+        print(
+            "{:>8} {:<26} {:>12} {:>12} {:>8}".format(
+                "size", "case", "baseline (s)", "current (s)", "ratio"
+            )
+        )
+        regressions = _compare(results, baseline["results"], args.threshold)
+        if regressions:
+            print("{} case(s) slower than the baseline".format(len(regressions)))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
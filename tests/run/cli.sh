@@ -7,6 +7,8 @@ set -eu
 LOG_LEVEL=${SALT_LOG_LEVEL:-error}
 export SALT_CONFIG_DIR=$PWD
 export SALT_ROSTER_FILE=$PWD/roster
+export SALT_ANSIBLE_INVENTORY=$PWD/ansible_hosts
+export SALT_PILLAR_ROOT=$PWD/pillar
 export SALT_SPROXY_PATH=$(salt-sproxy --installation-path)
 
 mkdir -p /tmp/sproxy-run/cache \
@@ -56,6 +58,54 @@ echo "Test targeting using cached grains"
 # previous execution, by default).
 salt-sproxy -G nodename:$(hostname) test.ping -p --static --out=json -l $LOG_LEVEL | jq -e '. | length == 105'
 
+echo "Roster file split into shards under a directory"
+salt-sproxy \* --roster-file $PWD/roster_shards --preview --out=json -l $LOG_LEVEL | jq -e '. | length == 6'
+salt-sproxy -G role:edge --roster-file $PWD/roster_shards test.ping --static --out=json -l $LOG_LEVEL | jq -e '. | length == 5'
+
+echo "Ansible Roster, using the native inventory parser"
+# Ansible is not installed, so the inventory can only be parsed natively.
+salt-sproxy \* --roster ansible --roster-file $SALT_ANSIBLE_INVENTORY --preview --out=json -l $LOG_LEVEL | jq -e '. | length == 6'
+
+echo "Ansible Roster, targeting a group"
+salt-sproxy -N edge --roster ansible --roster-file $SALT_ANSIBLE_INVENTORY --preview --out=json -l $LOG_LEVEL | jq -e '. == ["edge1", "edge2", "edge3", "edge4"]'
+
+echo "test.ping against the devices from the Ansible inventory"
+salt-sproxy -N network --roster ansible --roster-file $SALT_ANSIBLE_INVENTORY test.ping --static --out=json -l $LOG_LEVEL | jq -e '. | length == 6'
+
+echo "Multi Roster, merging the file, Ansible, and Pillar Rosters"
+# core1 and core2 are defined in both the file Roster and the Ansible inventory.
+salt-sproxy \* --roster multi --preview --out=json -l $LOG_LEVEL | jq -e '. | length == 112'
+
+echo "Multi Roster, targeting the devices from the Pillar"
+salt-sproxy -G role:pillar --roster multi --preview --out=json -l $LOG_LEVEL | jq -e '. == ["pillar1", "pillar2", "pillar3"]'
+
+echo "Streaming the results as NDJSON"
+# The summary is displayed on stderr, so stdout only has the results.
+salt-sproxy -G role:router test.ping --stream --summary -l $LOG_LEVEL | jq -s -e '. | length == 2 and all(.[]; .retcode == 0 and .return == true)'
+
+echo "Streaming the results into a file"
+salt-sproxy -G role:router test.ping --stream --stream-file /tmp/sproxy-run/stream.ndjson -l $LOG_LEVEL
+jq -s -e '. | map(.id) | sort == ["router1", "router2"]' /tmp/sproxy-run/stream.ndjson
+
+echo "Timings of each phase of the execution"
+salt-sproxy -G role:router test.ping --stream --timings -l $LOG_LEVEL | jq -s -e 'all(.[]; .timings.total >= .timings.function)'
+salt-sproxy -G role:router test.ping --stream --timings -l $LOG_LEVEL 2>&1 >/dev/null | grep -q "Timings (seconds)"
+
+echo "Only the changes since the last execution"
+salt-sproxy -G role:router test.ping --changes-only --static --out=json -l $LOG_LEVEL | jq -e '. | length == 2'
+salt-sproxy -G role:router test.ping --changes-only --static --out=json -l $LOG_LEVEL | jq -e '. == {}'
+
+echo "Differences from the last execution"
+salt-sproxy -G role:router test.random_hash --no-result-cache --changes-diff --static --out=json -l $LOG_LEVEL | jq -e '. | length == 2'
+salt-sproxy -G role:router test.random_hash --no-result-cache --changes-diff --static --out=json -l $LOG_LEVEL | jq -e 'all(.[]; .old != null and .old != .new)'
+
+echo "Results served from the cache"
+salt-sproxy -G role:router test.random_hash --static --out=json -l $LOG_LEVEL > /tmp/sproxy-run/hash.json
+salt-sproxy -G role:router test.random_hash --static --out=json -l $LOG_LEVEL | jq -e --slurpfile prev /tmp/sproxy-run/hash.json '. == $prev[0]'
+
+echo "Bypassing the results cache"
+salt-sproxy -G role:router test.random_hash --no-result-cache --static --out=json -l $LOG_LEVEL | jq -e --slurpfile prev /tmp/sproxy-run/hash.json '. | length == 2 and . != $prev[0]'
+
 echo "Test execution through the salt-sapi"
 curl -sS localhost:8080/run -H 'Accept: application/json' \
      -d eauth='auto' \